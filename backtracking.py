@@ -1,107 +1,63 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import time
-
-def solve_sudoku(board):
-    """
-    Solves a given Sudoku board using backtracking.
-    :param board: list of list of integers representing a Sudoku puzzle (0 represents an empty cell)
-    :return: True if the board is solvable, False otherwise
-    """
-    def find_empty_cell():
-        # Finds the next empty cell in the board
-        for i in range(9):
-            for j in range(9):
-                if board[i][j] == 0:
-                    return i, j
-        return None
-
-    def is_valid(row, col, num):
-        # Checks if it's valid to place num at the (row, col) position
-        for i in range(9):
-            if board[row][i] == num or board[i][col] == num:
-                return False
-
-        # Checks if it's valid to place num in the 3x3 sub-grid
-        subgrid_row, subgrid_col = row // 3 * 3, col // 3 * 3
-        for i in range(subgrid_row, subgrid_row + 3):
-            for j in range(subgrid_col, subgrid_col + 3):
-                if board[i][j] == num:
-                    return False
-
-        return True
-
-    def solve():
-        # Uses backtracking to solve the Sudoku puzzle
-        empty_cell = find_empty_cell()
-        if not empty_cell:
-            return True
-        else:
-            row, col = empty_cell
-
-        for num in range(1, 10):
-            if is_valid(row, col, num):
-                board[row][col] = num
-                if solve():
-                    return True
-                board[row][col] = 0
-
-        return False
-
-    # Start measuring time
-    start_time = time.time()
-
-    # Solves the Sudoku puzzle using backtracking
-    solved = solve()
-
-    # Stop measuring time
-    end_time = time.time()
-
-    if solved:
-        print("Sudoku solved successfully!")
-    else:
-        print("Sudoku is unsolvable.")
-
-    # Calculate and print the solving time
-    solving_time = end_time - start_time
-    print(f"Solving time: {solving_time} seconds")
-
-    return solved
-
-def plot_sudoku(grid):
-    fig, ax = plt.subplots(figsize=(6,6))
-    ax.imshow(grid, cmap='binary', vmin=0, vmax=9)
-    ax.set_xticks(np.arange(-.5, 9, 1))
-    ax.set_yticks(np.arange(-.5, 9, 1))
-    ax.grid(color='black', linestyle='-', linewidth=2)
-    ax.tick_params(axis='both', length=0)
-
-    for i in range(0, 10, 3):
-        ax.axhline(i-0.5, color='purple', linewidth=3)
-        ax.axvline(i-0.5, color='purple', linewidth=3)
-
-    for i in range(9):
-        for j in range(9):
-            if grid[i][j] != 0:
-                ax.text(j, i, grid[i][j], color='blue', fontsize=16, ha='center', va='center')
-    plt.axis('off')
-    plt.show()
-
-
-normal_sudoku = [
-                    [0,0,6, 7,0,0, 0,8,1],
-                    [0,4,0, 0,0,0, 9,0,0],
-                    [0,8,0, 0,0,3, 0,0,0],
-                # ------------------
-                    [0,5,0, 0,7,0, 0,0,0],
-                    [0,0,3, 5,0,6, 7,0,0],
-                    [0,0,0, 0,3,0, 0,5,0],
-                # ------------------
-                    [0,0,0, 8,0,0, 0,6,0],
-                    [0,0,2, 0,0,0, 0,9,0],
-                    [5,6,0, 0,0,9, 3,0,0]
-                ]
-
-solve_sudoku(normal_sudoku)
-
-plot_sudoku(normal_sudoku)
\ No newline at end of file
+import logging
+
+from bitmask_backtracking import solve
+from results import TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+def solve_sudoku(board, box_size=3, profile=None, budget=None):
+    """
+    Solves a given Sudoku board using backtracking.
+    The search runs on the bitmask engine of bitmask_backtracking (incremental
+    row/column/3x3 grid candidate masks and fewest-candidates cell selection).
+    :param board: list of list of integers (or board.Board) representing a Sudoku puzzle (0 represents an empty cell),
+                  filled in place if it is solvable
+    :param box_size: size of a box (3 for the usual 9x9 board, 4 for 16x16, ...)
+    :param profile: profiling.SolveProfile to fill (see profiling.py)
+    :param budget: budget.Budget of the solve (time, nodes, cancel handle), None for no limit
+    :return: results.SolveResult, true if the board is solvable
+    """
+    # Solves the Sudoku puzzle using backtracking
+    result = solve(board, box_size=box_size, profile=profile, budget=budget)
+
+    if result.solved:
+        for row, values in enumerate(result.grid.tolist()):
+            board[row][:] = values
+        logger.info("Sudoku solved successfully!")
+    elif result.status == TIMEOUT:
+        logger.info("Sudoku solve stopped on its budget.")
+    else:
+        logger.info("Sudoku is unsolvable.")
+    logger.info("Solving time: %s seconds", result.timings["total"])
+
+    return result
+
+def plot_sudoku(grid):
+    # Plotting lives in the optional rendering module, imported only when a plot is requested
+    from rendering import plot_sudoku
+    plot_sudoku(grid)
+
+
+if __name__ == "__main__":
+    from board import Board
+
+    logging.basicConfig(level=logging.INFO)
+
+    normal_sudoku = Board([
+                        [0,0,6, 7,0,0, 0,8,1],
+                        [0,4,0, 0,0,0, 9,0,0],
+                        [0,8,0, 0,0,3, 0,0,0],
+                    # ------------------
+                        [0,5,0, 0,7,0, 0,0,0],
+                        [0,0,3, 5,0,6, 7,0,0],
+                        [0,0,0, 0,3,0, 0,5,0],
+                    # ------------------
+                        [0,0,0, 8,0,0, 0,6,0],
+                        [0,0,2, 0,0,0, 0,9,0],
+                        [5,6,0, 0,0,9, 3,0,0]
+                    ])
+
+    solve_sudoku(normal_sudoku)
+
+    plot_sudoku(normal_sudoku)
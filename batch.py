@@ -0,0 +1,178 @@
+import argparse
+import multiprocessing
+import sys
+
+import numpy as np
+
+import bitmask_backtracking
+import dlx
+from budget import Budget
+from milp_backends import BACKENDS, get_backend
+from milp_matrix import MilpSudokuSolver
+from normal_sudoku import SudokuSolver
+from puzzle_io import format_grid, open_puzzle_file, read_puzzles, write_solutions
+from solution_cache import CachedSolver, SolutionCache
+from variants import VARIANTS, get_variant
+
+
+def _ilp_engine(variant, backend):
+    solver = SudokuSolver(variant=variant, msg=False, backend=backend)
+    return lambda puzzle, budget: solver.solve(puzzle, budget=budget)
+
+
+def _milp_engine(variant, backend):
+    solver = MilpSudokuSolver(variant)
+    return lambda puzzle, budget: solver.solve(puzzle, budget=budget)
+
+
+def _dlx_engine(variant, backend):
+    return lambda puzzle, budget: dlx.solve(puzzle, variant, budget=budget)
+
+
+def _backtracking_engine(variant, backend):
+    return lambda puzzle, budget: bitmask_backtracking.solve(puzzle, variant, budget=budget)
+
+
+# Engine name -> factory of a solve(puzzle, budget) function returning a results.SolveResult
+ENGINES = {
+    "ilp": _ilp_engine,                    # PuLP model with clue propagation on a MILP backend
+    "milp": _milp_engine,                  # NumPy constraint matrix on scipy milp
+    "dlx": _dlx_engine,                    # dancing links exact cover
+    "backtracking": _backtracking_engine,  # bitmask backtracking
+}
+
+
+# Engine name -> factory of a count(puzzle, limit) function returning the number of solutions up to limit
+COUNTERS = {
+    "ilp": lambda variant, backend: SudokuSolver(variant=variant, msg=False, backend=backend).count_solutions,
+    "milp": lambda variant, backend: MilpSudokuSolver(variant).count_solutions,
+    "dlx": lambda variant, backend: lambda puzzle, limit: dlx.count_solutions(puzzle, variant, limit),
+    "backtracking": lambda variant, backend: lambda puzzle, limit: bitmask_backtracking.count_solutions(puzzle, variant, limit),
+}
+
+
+# Warm solve (or count) function of the worker process, built once by _init_worker
+_worker_solve = None
+
+def _init_worker(engine, variant, backend, limit=None, budget=None, cache=None):
+    global _worker_solve
+    if limit is None:
+        solve = ENGINES[engine](variant, backend)
+        # The budget is started again by every solve
+        _worker_solve = lambda puzzle: solve(puzzle, budget)
+        if cache is not None:
+            _worker_solve = CachedSolver(_worker_solve, variant, SolutionCache(path=cache)).solve
+    else:
+        count = COUNTERS[engine](variant, backend)
+        _worker_solve = lambda puzzle: count(puzzle, limit)
+
+
+def _solve(puzzle):
+    return _worker_solve(np.asarray(puzzle).reshape(9, 9))
+
+
+def _solve_indexed(item):
+    index, puzzle = item
+    return index, _solve(puzzle)
+
+
+def solve_many(puzzles, variant="normal", workers=None, ordered=True, chunksize=8, backend=None, engine="ilp",
+               time_limit=None, node_limit=None, cancel=None, cache=None):
+    """
+    Solves an iterable of puzzles on a pool of worker processes.
+    Every worker builds the engine of the variant once and keeps it warm for all its puzzles.
+    :param puzzles: iterable of 9x9 grids (0 represents an empty cell)
+    :param variant: name of a registered variant
+    :param workers: number of worker processes (defaults to the number of cores)
+    :param ordered: yield the solutions in input order, otherwise as soon as they are ready
+    :param chunksize: number of puzzles sent to a worker at a time
+    :param backend: MILP backend name (see milp_backends.BACKENDS), the configurable default if None
+    :param engine: solver engine name (one of ENGINES)
+    :param time_limit: seconds per puzzle, the puzzles going over it get a TIMEOUT result
+    :param node_limit: search (or branch and bound) nodes per puzzle
+    :param cancel: budget.CancelHandle built on a multiprocessing event (CancelHandle(multiprocessing.Event())),
+                   once cancelled the remaining puzzles stop and get a TIMEOUT result
+    :param cache: SQLite file of the solution cache shared by the workers (see solution_cache.py), None for no cache
+    :return: generator of results.SolveResult, or of (index, SolveResult) tuples if ordered is False
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    get_variant(variant)
+    get_backend(backend)
+    budget = None
+    if time_limit is not None or node_limit is not None or cancel is not None:
+        budget = Budget(time_limit, node_limit, cancel)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(engine, variant, backend, None, budget, cache)) as pool:
+        if ordered:
+            yield from pool.imap(_solve, puzzles, chunksize)
+        else:
+            yield from pool.imap_unordered(_solve_indexed, enumerate(puzzles), chunksize)
+
+
+def count_many(puzzles, variant="normal", workers=None, limit=2, chunksize=8, backend=None, engine="backtracking"):
+    """
+    Counts the solutions of an iterable of puzzles on a pool of worker processes, up to limit each
+    (a count of 1 means the puzzle has a unique solution).
+    :return: generator of solution counts in input order
+    """
+    if engine not in COUNTERS:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(COUNTERS)}")
+    get_variant(variant)
+    get_backend(backend)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(engine, variant, backend, limit)) as pool:
+        yield from pool.imap(_solve, puzzles, chunksize)
+
+
+def _output_grid(result):
+    # Unsolved puzzles are written as all zeros
+    return result.grid if result.solved else np.zeros((9, 9), dtype=np.uint8)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of sudoku puzzles (81 character lines or CSV, optionally .gz/.bz2)")
+    parser.add_argument("input", help="puzzle file, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="solution file (.gz/.bz2 to compress), '-' for stdout")
+    parser.add_argument("--variant", default="normal", choices=sorted(VARIANTS))
+    parser.add_argument("--engine", default="ilp", choices=sorted(ENGINES))
+    parser.add_argument("--backend", default=None, choices=sorted(BACKENDS), help="MILP backend (default: milp_backends.DEFAULT_BACKEND)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--mmap", action="store_true", help="memory-map the input file (plain files only)")
+    parser.add_argument("--unordered", action="store_true", help="write '<index> <solution>' lines as soon as they are solved")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per puzzle, unsolved puzzles are written as all zeros")
+    parser.add_argument("--node-limit", type=int, default=None, help="search (or branch and bound) nodes per puzzle")
+    parser.add_argument("--cache", default=None, help="SQLite solution cache file, puzzles equivalent to a cached one are not solved again")
+    parser.add_argument("--count", type=int, metavar="LIMIT", default=None,
+                        help="write the number of solutions of every puzzle (up to LIMIT) instead of a solution")
+    args = parser.parse_args(argv)
+
+    puzzles = read_puzzles(args.input, use_mmap=args.mmap)
+    if args.count is not None:
+        counts = count_many(puzzles, variant=args.variant, workers=args.workers, limit=args.count,
+                            backend=args.backend, engine=args.engine)
+        target = open_puzzle_file(args.output, "w")
+        try:
+            for count in counts:
+                target.write(f"{count}\n")
+        finally:
+            if target is not sys.stdout:
+                target.close()
+        return
+
+    results = solve_many(puzzles, variant=args.variant, workers=args.workers, ordered=not args.unordered,
+                         backend=args.backend, engine=args.engine, time_limit=args.time_limit, node_limit=args.node_limit,
+                         cache=args.cache)
+    if not args.unordered:
+        write_solutions(args.output, (_output_grid(result) for result in results))
+        return
+
+    target = open_puzzle_file(args.output, "w")
+    try:
+        for index, result in results:
+            target.write(f"{index} {format_grid(_output_grid(result))}\n")
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+
+import numpy as np
+
+import dlx
+import x_wing_method
+import bitmask_backtracking
+from milp_matrix import MilpSudokuSolver
+from normal_sudoku import SudokuSolver
+from puzzle_io import parse_puzzle
+from variants import get_variant
+
+# Versioned corpus next to this file, see the header of the file for its format
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus.csv")
+LEVELS = ("easy", "medium", "hard", "extreme")
+
+
+def load_corpus(path=CORPUS):
+    """
+    Reads the benchmark corpus: '#' comment lines (one of them '# version: N') and variant,level,puzzle lines.
+    :return: (version, list of (variant, level, puzzle) tuples)
+    """
+    version = None
+    entries = []
+    with open(path) as corpus:
+        for line in corpus:
+            line = line.strip()
+            if line.startswith("# version:"):
+                version = int(line.split(":", 1)[1])
+            if not line or line.startswith("#"):
+                continue
+            variant, level, puzzle = line.split(",")
+            entries.append((variant, level, parse_puzzle(puzzle)))
+    return version, entries
+
+
+def _ilp_engine(backend):
+    def build(variant):
+        solver = SudokuSolver(variant=variant, msg=False, backend=backend)
+        return lambda puzzle: solver.solve(puzzle).grid
+    return build
+
+
+def _milp_engine(variant):
+    solver = MilpSudokuSolver(variant)
+    return lambda puzzle: solver.solve(puzzle).grid
+
+
+def _dlx_engine(variant):
+    return lambda puzzle: dlx.solve(puzzle, variant).grid
+
+
+def _backtracking_engine(propagate):
+    def build(variant):
+        return lambda puzzle: bitmask_backtracking.solve(puzzle, variant, propagate).grid
+    return build
+
+
+def _x_wing_engine(variant):
+    # Propagation with X-Wing, then the plain recursive backtracking of x_wing_method (normal sudoku only)
+    def solve(puzzle):
+        board = puzzle.tolist()
+        return board if x_wing_method.apply_x_wing(board) and x_wing_method.solve_sudoku(board).solved else None
+    return solve
+
+
+# Engine name -> factory of a solve(puzzle) function for a variant, returning the solved grid or None
+ENGINES = {
+    "ilp_cbc": _ilp_engine("cbc"),                         # PuLP model solved by the CBC subprocess
+    "ilp_highs": _ilp_engine("highs"),                     # PuLP model solved by HiGHS in-process
+    "milp": _milp_engine,                                  # sparse matrix straight to scipy milp
+    "dlx": _dlx_engine,                                    # dancing links exact cover
+    "backtracking": _backtracking_engine(False),           # plain bitmask backtracking
+    "propagation_backtracking": _backtracking_engine(True),  # constraint propagation, then bitmask backtracking
+    "x_wing_backtracking": _x_wing_engine,                 # x_wing_method.py
+}
+
+# Engines limited to some variants
+ENGINE_VARIANTS = {"x_wing_backtracking": ("normal",)}
+
+
+def is_solution(grid, puzzle, variant):
+    # Every region holds every value once and the given cells are kept
+    variant = get_variant(variant)
+    if grid is None:
+        return False
+    grid = np.asarray(grid).reshape(variant.cells)
+    puzzle = np.asarray(puzzle).reshape(variant.cells)
+    values = np.sort(grid[variant.region_cells], axis=1)
+    return bool((values == np.arange(1, variant.size + 1)).all() and ((puzzle == 0) | (puzzle == grid)).all())
+
+
+def run_case(solve, puzzles, variant, warmup=1, trials=5):
+    """
+    Benchmarks one solve function on a group of puzzles.
+    :param warmup: untimed passes over the puzzles before the measurement
+    :param trials: timed passes over the puzzles, every solve is timed on its own with perf_counter
+    :return: dict of latency percentiles (ms), throughput (puzzles/s), peak Python memory (KiB) and failures
+    """
+    for _ in range(warmup):
+        for puzzle in puzzles:
+            solve(puzzle)
+
+    latencies = []
+    failures = 0
+    for _ in range(trials):
+        for puzzle in puzzles:
+            start = time.perf_counter()
+            solution = solve(puzzle)
+            latencies.append(time.perf_counter() - start)
+            failures += not is_solution(solution, puzzle, variant)
+
+    # Separate pass for the memory: tracemalloc slows the solves down
+    tracemalloc.start()
+    try:
+        for puzzle in puzzles:
+            solve(puzzle)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return dict(solves=len(latencies), failures=failures,
+                p50_ms=p50, p95_ms=p95, p99_ms=p99, mean_ms=latencies.mean(),
+                throughput_per_s=len(latencies) / (latencies.sum() / 1000),
+                peak_memory_kib=peak / 1024)
+
+
+def run_benchmark(engines=tuple(ENGINES), variants=None, levels=LEVELS, warmup=1, trials=5, corpus=CORPUS, progress=None):
+    """
+    Runs every engine on every (variant, level) group of the corpus.
+    :param variants: variants to run (all the variants of the corpus if None)
+    :param progress: optional callback called with every result as it is measured
+    :return: JSON-serializable report with the environment, the settings and one result per (engine, variant, level)
+    """
+    version, entries = load_corpus(corpus)
+    groups = {}
+    for variant, level, puzzle in entries:
+        if (variants is None or variant in variants) and level in levels:
+            groups.setdefault(variant, {}).setdefault(level, []).append(puzzle)
+
+    results = []
+    for engine in engines:
+        for variant, by_level in groups.items():
+            if variant not in ENGINE_VARIANTS.get(engine, (variant,)):
+                continue
+            start = time.perf_counter()
+            solve = ENGINES[engine](variant)
+            build = time.perf_counter() - start
+            for level in levels:
+                if level not in by_level:
+                    continue
+                result = dict(engine=engine, variant=variant, level=level, puzzles=len(by_level[level]), build_s=build)
+                result.update(run_case(solve, by_level[level], variant, warmup, trials))
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+
+    packages = {}
+    for package in ("numpy", "scipy", "pulp"):
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return dict(corpus_version=version, created=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                python=platform.python_version(), platform=platform.platform(), packages=packages,
+                warmup=warmup, trials=trials, results=results)
+
+
+def compare_reports(baseline, current, tolerance=0.2):
+    """
+    Finds the regressions of a report against a baseline report (same engine, variant and level).
+    :param tolerance: allowed relative increase of p50 and p95 latency
+    :return: list of (engine, variant, level, metric, baseline value, current value)
+    """
+    previous = {(result["engine"], result["variant"], result["level"]): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["engine"], result["variant"], result["level"]))
+        if old is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if result[metric] > old[metric] * (1 + tolerance):
+                regressions.append((result["engine"], result["variant"], result["level"], metric, old[metric], result[metric]))
+        if result["failures"] > old["failures"]:
+            regressions.append((result["engine"], result["variant"], result["level"], "failures", old["failures"], result["failures"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solvers on the versioned puzzle corpus")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--variants", nargs="+", default=None, help="variants of the corpus to run (default: all)")
+    parser.add_argument("--levels", nargs="+", default=list(LEVELS), choices=LEVELS)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed passes before the measurement")
+    parser.add_argument("--trials", type=int, default=5, help="timed passes over every puzzle group")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("-o", "--output", default=None, help="JSON report file (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="JSON report of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative latency increase against the baseline")
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        print(f"{result['engine']:>24} {result['variant']:>13} {result['level']:>7}  p50 {result['p50_ms']:9.2f} ms"
+              f"  p95 {result['p95_ms']:9.2f} ms  {result['throughput_per_s']:9.1f}/s  failures {result['failures']}",
+              file=sys.stderr)
+
+    report = run_benchmark(args.engines, args.variants, args.levels, args.warmup, args.trials, args.corpus, progress)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline:
+            regressions = compare_reports(json.load(baseline), report, args.tolerance)
+        for engine, variant, level, metric, old, new in regressions:
+            print(f"REGRESSION {engine} {variant} {level} {metric}: {old:.2f} -> {new:.2f}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import sys
+from time import perf_counter
+
+from profiling import NULL_PROFILE, finish_profile, start_profile
+from propagation import CandidateGrid, Contradiction
+from results import INFEASIBLE, SOLVED, TIMEOUT, make_result
+from variants import get_variant
+
+
+def _search(board, variant, propagate, limit, profile=NULL_PROFILE, budget=None):
+    """
+    Bitmask backtracking search shared by solve_board, solve and count_solutions.
+    :param profile: profiling.SolveProfile receiving the "propagate" and "search" phases, the nodes and
+                    backtracks of the search and the placements/eliminations of every propagation technique used
+    :param budget: started budget.Budget checked during the search, None for no limit
+    :return: (number of solutions found up to limit, first solution as a flat list of values or None,
+              True if the search stopped on its budget, dict of the nodes and backtracks of the search)
+    """
+    size = variant.size
+    if propagate:
+        try:
+            with profile.phase("propagate"):
+                candidate_grid = CandidateGrid(board, variant)
+                try:
+                    candidate_grid.propagate()
+                finally:
+                    for technique, technique_count in candidate_grid.counts.items():
+                        if technique_count:
+                            profile.count(f"propagation_{technique}", technique_count)
+        except Contradiction:
+            return 0, None, False, dict(nodes=0, backtracks=0)
+        values, allowed = candidate_grid.values, candidate_grid.candidates
+    else:
+        values = [int(board[row][col]) for row in range(size) for col in range(size)]
+        if not all(0 <= value <= size for value in values):
+            # Clue outside 1..size
+            return 0, None, False, dict(nodes=0, backtracks=0)
+        allowed = [(1 << size) - 1] * variant.cells
+
+    cell_regions = variant.cell_regions
+    region_used = [0] * len(variant.regions)
+    empty = []
+
+    for cell, value in enumerate(values):
+        regions = cell_regions[cell]
+        if value == 0:
+            # The row, column and box regions come first, then the extra regions of the variant,
+            # then the candidates left by the propagation
+            empty.append((cell // size, cell % size, regions[0], regions[1], regions[2], regions[3:], allowed[cell]))
+            continue
+        bit = 1 << (value - 1)
+        for region in regions:
+            # Contradicting clues
+            if region_used[region] & bit:
+                return 0, None, False, dict(nodes=0, backtracks=0)
+            region_used[region] |= bit
+
+    count = len(empty)
+    placed = [0] * count
+    # The search recurses once per empty cell (up to 1296 for 36x36 boards)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), count + 100))
+    found = 0
+    first_solution = None
+    # Search nodes (calls of search) and values taken back
+    nodes = backtracks = 0
+    # Node count of the next budget check: the first node, then every CHECK_INTERVAL nodes (never without a budget)
+    next_check = sys.maxsize if budget is None else 1
+    stopped = False
+
+    def search(depth):
+        # Every empty cell is filled, returns True once limit solutions are found or the budget is used up
+        nonlocal found, first_solution, nodes, backtracks, next_check, stopped
+        nodes += 1
+        if nodes >= next_check:
+            if budget.exhausted(nodes):
+                stopped = True
+                return True
+            next_check = budget.next_check(nodes)
+        if depth == count:
+            found += 1
+            if first_solution is None:
+                first_solution = list(values)
+                for (row, col, *_), value in zip(empty, placed):
+                    first_solution[row*size + col] = value
+            return found >= limit
+
+        # Pick the empty cell with the fewest candidates among empty[depth:]
+        best = depth
+        best_count = size + 1
+        best_candidates = 0
+        for index in range(depth, count):
+            _, _, row_region, col_region, box_region, extra_regions, cell_allowed = empty[index]
+            used = region_used[row_region] | region_used[col_region] | region_used[box_region]
+            for region in extra_regions:
+                used |= region_used[region]
+            candidates = cell_allowed & ~used
+            candidate_count = candidates.bit_count()
+            if candidate_count < best_count:
+                best, best_count, best_candidates = index, candidate_count, candidates
+                if candidate_count <= 1:
+                    break
+        if best_count == 0:
+            return False
+
+        empty[depth], empty[best] = empty[best], empty[depth]
+        regions = empty[depth][2:5] + empty[depth][5]
+
+        while best_candidates:
+            bit = best_candidates & -best_candidates
+            best_candidates ^= bit
+            for region in regions:
+                region_used[region] |= bit
+            placed[depth] = bit.bit_length()
+            if search(depth + 1):
+                return True
+            for region in regions:
+                region_used[region] ^= bit
+            backtracks += 1
+
+        return False
+
+    with profile.phase("search"):
+        search(0)
+    profile.count("nodes", nodes)
+    profile.count("backtracks", backtracks)
+    return found, first_solution, stopped, dict(nodes=nodes, backtracks=backtracks)
+
+
+def solve_board(board, variant="normal", propagate=True, box_size=None, profile=None):
+    """
+    Solves a Sudoku board in place with bitmask backtracking.
+    Every region of the variant (rows, columns, boxes and extra regions)
+    keeps a bitmask of its used values that is updated on place and undo, and
+    the search always branches on the empty cell with the fewest candidates
+    (minimum remaining values).
+    :param board: list of list of integers (or 2D array, or board.Board) representing a Sudoku puzzle (0 represents an empty cell)
+    :param variant: name of a registered variant or a Variant
+    :param propagate: run the constraint propagation first (see propagation.py), the search only
+                      starts from its grid and candidates if it does not solve the puzzle alone
+    :param box_size: box size of the board (e.g. 4 for 16x16), the size of the variant if None
+    :param profile: profiling.SolveProfile to fill (see profiling.py)
+    :return: True if the board is solvable (and has been filled), False otherwise (the board is left unchanged)
+    """
+    variant = get_variant(variant, box_size)
+    profile = start_profile(profile, "backtracking")
+    found, solution, _, _ = _search(board, variant, propagate, 1, profile)
+    finish_profile(profile)
+    if not found:
+        return False
+    for cell, value in enumerate(solution):
+        board[cell // variant.size][cell % variant.size] = value
+    return True
+
+
+def solve(board, variant="normal", propagate=True, box_size=None, profile=None, budget=None):
+    """
+    Solves a Sudoku board with the search of solve_board, without changing the board.
+    :param board: list of list of integers (or 2D array, or board.Board) representing a Sudoku puzzle (0 represents an empty cell)
+    :param profile: profiling.SolveProfile to fill (see profiling.py)
+    :param budget: budget.Budget of the solve (time, nodes, cancel handle), None for no limit
+    :return: results.SolveResult with the solved grid (INFEASIBLE if the puzzle has no solution,
+             TIMEOUT if the budget ran out first), the nodes and backtracks in stats
+    """
+    start = perf_counter()
+    variant = get_variant(variant, box_size)
+    profile = start_profile(profile, "backtracking")
+    if budget is not None:
+        budget.start()
+    found, solution, stopped, stats = _search(board, variant, propagate, 1, profile, budget)
+    finish_profile(profile)
+    status = SOLVED if found else TIMEOUT if stopped else INFEASIBLE
+    return make_result("backtracking", status, solution, variant.size, profile, start, **stats)
+
+
+def count_solutions(board, variant="normal", limit=2, propagate=True, box_size=None, profile=None):
+    """
+    Counts the solutions of a puzzle with the same search, stopping as soon as limit solutions are found.
+    count_solutions(board) == 1 checks that the puzzle has a unique solution.
+    :param board: list of list of integers (or 2D array, or board.Board) representing a Sudoku puzzle (0 represents an empty cell)
+    :return: number of solutions found (limit means limit or more)
+    """
+    profile = start_profile(profile, "backtracking")
+    found = _search(board, get_variant(variant, box_size), propagate, limit, profile)[0]
+    finish_profile(profile)
+    return found
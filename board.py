@@ -0,0 +1,136 @@
+from math import isqrt
+
+import numpy as np
+
+from puzzle_io import format_grid, parse_puzzle
+
+
+def pack_grids(grids):
+    """
+    Packs grids two cells per byte (4 bits per cell, the first cell in the high nibble),
+    for boards whose values fit in 4 bits (9x9 and 4x4): 41 bytes per 9x9 grid instead of 81.
+    :param grids: (n, size, size) or (n, cells) array of integers
+    :return: (n, (cells + 1) // 2) uint8 array
+    """
+    grids = np.asarray(grids, dtype=np.uint8)
+    grids = grids.reshape(len(grids), -1)
+    if grids.size and grids.max() > 15:
+        raise ValueError("Values above 15 do not fit in 4 bits")
+    if grids.shape[1] % 2:
+        # Odd number of cells: the last byte holds the last cell and an empty low nibble
+        grids = np.concatenate([grids, np.zeros((len(grids), 1), dtype=np.uint8)], axis=1)
+    return (grids[:, 0::2] << 4) | grids[:, 1::2]
+
+
+def unpack_grids(packed, box_size=3):
+    """
+    Inverse of pack_grids.
+    :param packed: (n, (cells + 1) // 2) array of packed grids
+    :return: (n, size, size) uint8 array
+    """
+    size = box_size * box_size
+    packed = np.asarray(packed, dtype=np.uint8)
+    packed = packed.reshape(len(packed), -1)
+    grids = np.empty((len(packed), 2 * packed.shape[1]), dtype=np.uint8)
+    grids[:, 0::2] = packed >> 4
+    grids[:, 1::2] = packed & 15
+    return grids[:, :size * size].reshape(len(packed), size, size)
+
+
+class Board:
+    """
+    Compact Sudoku board: one uint8 per cell in a flat buffer (81 bytes for a 9x9 board).
+    board[row][col], board[row, col], the rows, columns and boxes are numpy views of the buffer
+    (writing to them fills the board), and np.asarray(board) is a size x size view, so a Board
+    can be passed wherever a grid is expected (solvers, puzzle_io, rendering) without a copy.
+    :param grid: size x size grid or flat cells of integers, an empty board if None
+                 (contiguous uint8 arrays are wrapped without copying)
+    :param box_size: size of a box, deduced from the number of cells if None
+    """
+    __slots__ = ("cells", "size", "box_size")
+
+    def __init__(self, grid=None, box_size=None):
+        if grid is None:
+            box_size = 3 if box_size is None else box_size
+            grid = np.zeros(box_size ** 4, dtype=np.uint8)
+        self.cells = np.asarray(grid, dtype=np.uint8).reshape(-1)
+        self.size = isqrt(len(self.cells))
+        self.box_size = isqrt(self.size) if box_size is None else box_size
+        if self.size * self.size != len(self.cells) or self.box_size * self.box_size != self.size:
+            raise ValueError(f"{len(self.cells)} cells do not make a board of {self.box_size}x{self.box_size} boxes")
+
+    @classmethod
+    def from_string(cls, line):
+        # 81 characters, see puzzle_io.parse_puzzle
+        return cls(parse_puzzle(line))
+
+    @classmethod
+    def frombuffer(cls, buffer, box_size=3):
+        # Wraps one byte per cell without copying (read-only for bytes, writable for bytearray/memoryview)
+        return cls(np.frombuffer(buffer, dtype=np.uint8, count=box_size ** 4), box_size)
+
+    @classmethod
+    def unpack(cls, packed, box_size=3):
+        # Board of a grid packed by pack()
+        return cls(unpack_grids(np.frombuffer(packed, dtype=np.uint8)[None], box_size)[0], box_size)
+
+    @property
+    def array(self):
+        # size x size view of the buffer
+        return self.cells.reshape(self.size, self.size)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype) != np.uint8:
+            return self.array.astype(dtype)
+        return self.array.copy() if copy else self.array
+
+    def row(self, row):
+        return self.array[row]
+
+    def column(self, col):
+        return self.array[:, col]
+
+    def box(self, box):
+        # box_size x box_size view of a box, numbered row by row
+        row = box // self.box_size * self.box_size
+        col = box % self.box_size * self.box_size
+        return self.array[row:row + self.box_size, col:col + self.box_size]
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __setitem__(self, index, value):
+        self.array[index] = value
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.size == other.size and np.array_equal(self.cells, other.cells)
+
+    __hash__ = None
+
+    def copy(self):
+        return Board(self.cells.copy(), self.box_size)
+
+    def tobytes(self):
+        return self.cells.tobytes()
+
+    def pack(self):
+        # 4 bits per cell, see pack_grids
+        return pack_grids(self.cells[None])[0].tobytes()
+
+    def __str__(self):
+        if self.size == 9:
+            return format_grid(self.cells)
+        return "\n".join(" ".join(str(value) for value in row) for row in self.array.tolist())
+
+    def __repr__(self):
+        if self.size == 9:
+            return f"Board.from_string({str(self)!r})"
+        return f"Board({self.array.tolist()!r})"
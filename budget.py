@@ -0,0 +1,63 @@
+import threading
+from time import perf_counter
+
+
+class CancelHandle:
+    """
+    Cancels the solves whose Budget holds it, from another thread (or another process when
+    built on a multiprocessing event). Cancelling is cooperative: the search engines check
+    it with their budget, the MILP engines before handing the model to the solver.
+    :param event: threading.Event-like object with set() and is_set(), a new threading.Event if None
+    """
+    def __init__(self, event=None):
+        self.event = threading.Event() if event is None else event
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class Budget:
+    """
+    Wall-clock and node budget of a solve. An engine calls start() when the solve starts;
+    once the budget runs out (or its cancel handle is triggered) the solve returns a TIMEOUT result.
+    The MILP engines pass the limits on to the backend (time limit, branch and bound node limit),
+    the search engines check the budget every CHECK_INTERVAL nodes. The node limit of the MILP
+    backends does not bound the root LP relaxation, combine it with a time limit.
+    :param time_limit: seconds of wall-clock time per solve, None for no limit
+    :param node_limit: search nodes per solve (branch and bound nodes for the MILP backends), None for no limit
+    :param cancel: CancelHandle of the solve
+    """
+    CHECK_INTERVAL = 256
+
+    def __init__(self, time_limit=None, node_limit=None, cancel=None):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.cancel = cancel
+        self.deadline = None
+
+    def start(self):
+        self.deadline = None if self.time_limit is None else perf_counter() + self.time_limit
+        return self
+
+    def remaining(self):
+        # Seconds left before the deadline (None for no time limit)
+        return None if self.deadline is None else max(self.deadline - perf_counter(), 0.0)
+
+    def exhausted(self, nodes=0):
+        """
+        :param nodes: search nodes used so far
+        :return: True if the solve has to stop (time or nodes used up, or cancelled)
+        """
+        return ((self.cancel is not None and self.cancel.cancelled)
+                or (self.deadline is not None and perf_counter() >= self.deadline)
+                or (self.node_limit is not None and nodes >= self.node_limit))
+
+    def next_check(self, nodes):
+        # Node count at which a search checks the budget again
+        if self.node_limit is None:
+            return nodes + self.CHECK_INTERVAL
+        return min(nodes + self.CHECK_INTERVAL, self.node_limit)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from variants import get_variant
+
+
+def propagate_clues(input_sudoku, variant="normal"):
+    """
+    Clue propagation stage run before the ILP model is built.
+    Every given cell keeps only its own value and every value given in a region
+    is removed from the candidates of the other cells of that region.
+    :param input_sudoku: size x size grid of integers (0 represents an empty cell)
+    :param variant: name of a registered variant or a Variant
+    :return: (grid, candidates, feasible) where grid is the flat puzzle, candidates[cell, value-1]
+             is True if value can still be placed at cell and feasible is False if the clues
+             already contradict each other
+    """
+    variant = get_variant(variant)
+    grid = np.asarray(input_sudoku, dtype=int).reshape(variant.cells)
+    candidates = np.ones((variant.cells, variant.size), dtype=bool)
+    if ((grid < 0) | (grid > variant.size)).any():
+        # A clue outside 1..size can never be placed
+        return grid, candidates, False
+    feasible = True
+
+    # Remove the values given in a region from all the cells of that region
+    for cells in variant.region_cells:
+        placed = grid[cells]
+        placed = placed[placed != 0]
+        if len(placed) != len(np.unique(placed)):
+            feasible = False
+        candidates[np.ix_(cells, placed - 1)] = False
+
+    # A given cell keeps only its own value
+    given = np.flatnonzero(grid)
+    candidates[given] = False
+    candidates[given, grid[given] - 1] = True
+
+    # An empty cell without any candidate can never be filled
+    if not candidates.any(axis=1).all():
+        feasible = False
+
+    return grid, candidates, feasible
@@ -0,0 +1,11 @@
+import pytest
+
+import dlx
+from benchmark import load_corpus
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    # (variant, level, puzzle, flat solution) of every puzzle of the benchmark corpus
+    return [(variant, level, puzzle, dlx.solve(puzzle, variant).grid.reshape(-1))
+            for variant, level, puzzle in load_corpus()[1]]
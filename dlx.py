@@ -0,0 +1,247 @@
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from profiling import NULL_PROFILE, finish_profile, start_profile
+from results import INFEASIBLE, SOLVED, TIMEOUT, make_result
+from variants import get_variant
+
+
+class DancingLinks:
+    """
+    Exact cover matrix of a sudoku variant solved with Knuth's Algorithm X on dancing links.
+    Columns: one per cell (filled once) and one per (region, value) pair (value placed once in the region).
+    Rows: one per (cell, value) placement.
+    The links are stored in flat integer lists and built once per variant; every
+    puzzle covers the rows of its clues, searches and uncovers them again.
+    :param variant: name of a registered variant or a Variant
+    """
+    def __init__(self, variant="normal"):
+        variant = get_variant(variant)
+        self.size = size = variant.size
+        self.cells = cells = variant.cells
+        # The search recurses once per placed row, up to one per cell (1296 for 36x36 boards)
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), cells + 100))
+        columns = cells + size * len(variant.regions)
+        # Node 0 is the root, nodes 1..columns are the column headers
+        self.L = [index - 1 for index in range(columns + 1)]
+        self.R = [index + 1 for index in range(columns + 1)]
+        self.L[0], self.R[columns] = columns, 0
+        self.U = list(range(columns + 1))
+        self.D = list(range(columns + 1))
+        self.C = list(range(columns + 1))
+        self.S = [0] * (columns + 1)
+        # Placement (cell * size + value - 1) of every node and first node of every placement
+        self.placement = [-1] * (columns + 1)
+        self.first_node = []
+
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        for cell in range(cells):
+            for value in range(size):
+                row_columns = [1 + cell] + [1 + cells + region_index*size + value for region_index in variant.cell_regions[cell]]
+                first = len(C)
+                for offset, column in enumerate(row_columns):
+                    node = first + offset
+                    # Append the node at the bottom of its column and at the end of its row
+                    U.append(U[column])
+                    D.append(column)
+                    D[U[column]] = node
+                    U[column] = node
+                    L.append(node - 1 if offset else first + len(row_columns) - 1)
+                    R.append(node + 1 if offset < len(row_columns) - 1 else first)
+                    C.append(column)
+                    S[column] += 1
+                    self.placement.append(cell*size + value)
+                self.first_node.append(first)
+
+    def cover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[column]] = L[column]
+        R[L[column]] = R[column]
+        i = D[column]
+        while i != column:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[column]
+        while i != column:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[column]] = column
+        R[L[column]] = column
+
+    def search(self, limit, profile=NULL_PROFILE, budget=None):
+        """
+        Runs Algorithm X on the current (partially covered) matrix.
+        :param limit: stop after this many solutions
+        :param profile: profiling.SolveProfile receiving the nodes and backtracks of the search
+        :param budget: started budget.Budget checked during the search, None for no limit
+        :return: (number of solutions found, placements of the first solution,
+                  True if the search stopped on its budget, dict of the nodes and backtracks)
+        """
+        L, R, D, C, S = self.L, self.R, self.D, self.C, self.S
+        cover, uncover = self.cover, self.uncover
+        stack = []
+        first_solution = []
+        found = 0
+        # Search nodes (calls of recurse) and rows taken back
+        nodes = backtracks = 0
+        # Node count of the next budget check: the first node, then every CHECK_INTERVAL nodes (never without a budget)
+        next_check = sys.maxsize if budget is None else 1
+        stopped = False
+
+        def recurse():
+            # Returns True once limit solutions are found or the budget is used up, the
+            # covered columns are always uncovered on the way back
+            nonlocal found, nodes, backtracks, next_check, stopped
+            nodes += 1
+            if nodes >= next_check:
+                if budget.exhausted(nodes):
+                    stopped = True
+                    return True
+                next_check = budget.next_check(nodes)
+            if R[0] == 0:
+                found += 1
+                if not first_solution:
+                    first_solution.extend(stack)
+                return found >= limit
+
+            # Choose the column with the fewest remaining rows
+            column = R[0]
+            best = S[column]
+            j = R[column]
+            while j != 0 and best > 1:
+                if S[j] < best:
+                    column, best = j, S[j]
+                j = R[j]
+            if best == 0:
+                return False
+
+            cover(column)
+            i = D[column]
+            while i != column:
+                stack.append(i)
+                j = R[i]
+                while j != i:
+                    cover(C[j])
+                    j = R[j]
+                done = recurse()
+                j = L[i]
+                while j != i:
+                    uncover(C[j])
+                    j = L[j]
+                stack.pop()
+                if done:
+                    break
+                backtracks += 1
+                i = D[i]
+            uncover(column)
+            return found >= limit or stopped
+
+        recurse()
+        profile.count("nodes", nodes)
+        profile.count("backtracks", backtracks)
+        return found, [self.placement[node] for node in first_solution], stopped, dict(nodes=nodes, backtracks=backtracks)
+
+    def run(self, input_sudoku, limit=1, profile=NULL_PROFILE, budget=None):
+        """
+        :param input_sudoku: size x size grid of integers (0 represents an empty cell)
+        :param limit: stop after this many solutions
+        :param profile: profiling.SolveProfile receiving the "clues" and "search" phases and the search counters
+        :param budget: started budget.Budget checked during the search, None for no limit
+        :return: (number of solutions found up to limit, first solution as a size x size grid or None,
+                  True if the search stopped on its budget, dict of the nodes and backtracks of the search)
+        """
+        grid = np.asarray(input_sudoku, dtype=int).reshape(self.cells)
+        if ((grid < 0) | (grid > self.size)).any():
+            # A clue outside 1..size has no row in the matrix
+            return 0, None, False, dict(nodes=0, backtracks=0)
+        L, R, C = self.L, self.R, self.C
+        covered = []
+        found, placements, stopped, stats = 0, [], False, {}
+        try:
+            with profile.phase("clues"):
+                # Select the rows of the clues, a clue whose columns are already covered contradicts an earlier clue
+                for cell in np.flatnonzero(grid):
+                    first = self.first_node[cell*self.size + grid[cell] - 1]
+                    node = first
+                    while True:
+                        if L[R[C[node]]] != C[node]:
+                            return 0, None, False, dict(nodes=0, backtracks=0)
+                        node = R[node]
+                        if node == first:
+                            break
+                    while True:
+                        self.cover(C[node])
+                        covered.append(C[node])
+                        node = R[node]
+                        if node == first:
+                            break
+
+            with profile.phase("search"):
+                found, placements, stopped, stats = self.search(limit, profile, budget)
+        finally:
+            # Restore the matrix for the next puzzle
+            for column in reversed(covered):
+                self.uncover(column)
+
+        if not found:
+            return 0, None, stopped, stats
+        solution = grid.copy()
+        for placement in placements:
+            solution[placement // self.size] = placement % self.size + 1
+        return found, solution.reshape(self.size, self.size), stopped, stats
+
+
+# Exact cover matrix of every variant, built on first use
+_matrices = {}
+
+def get_matrix(variant, box_size=None):
+    variant = get_variant(variant, box_size)
+    if variant.name not in _matrices:
+        _matrices[variant.name] = DancingLinks(variant)
+    return _matrices[variant.name]
+
+
+def solve(puzzle, variant="normal", box_size=None, profile=None, budget=None):
+    """
+    Solves a puzzle of any variant with dancing links.
+    :param box_size: box size of the board (e.g. 4 for 16x16), the size of the variant if None
+    :param profile: profiling.SolveProfile to fill (see profiling.py)
+    :param budget: budget.Budget of the solve (time, nodes, cancel handle), None for no limit
+    :return: results.SolveResult with the solved grid (INFEASIBLE if the puzzle has no solution,
+             TIMEOUT if the budget ran out first), the nodes and backtracks in stats
+    """
+    start = perf_counter()
+    profile = start_profile(profile, "dlx")
+    matrix = get_matrix(variant, box_size)
+    if budget is not None:
+        budget.start()
+    found, solution, stopped, stats = matrix.run(puzzle, 1, profile, budget)
+    finish_profile(profile)
+    status = SOLVED if found else TIMEOUT if stopped else INFEASIBLE
+    return make_result("dlx", status, solution, matrix.size, profile, start, **stats)
+
+
+def count_solutions(puzzle, variant="normal", limit=2, box_size=None, profile=None):
+    """
+    Counts the solutions of a puzzle, stopping as soon as limit solutions are found.
+    count_solutions(puzzle) == 1 checks that the puzzle has a unique solution.
+    """
+    profile = start_profile(profile, "dlx")
+    found = get_matrix(variant, box_size).run(puzzle, limit, profile)[0]
+    finish_profile(profile)
+    return found
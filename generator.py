@@ -0,0 +1,180 @@
+import argparse
+import multiprocessing
+import sys
+
+import numpy as np
+
+import bitmask_backtracking
+from budget import Budget
+from propagation import CandidateGrid, Contradiction
+from puzzle_io import format_grid, open_puzzle_file
+from solution_cache import canonical_form
+from variants import VARIANTS, get_variant
+
+
+def random_grid(variant="normal", rng=None):
+    """
+    Random full grid of a variant: values drawn at random among the candidates of random cells
+    (2 * size of them), then completed by the bitmask search.
+    :param rng: numpy Generator
+    :return: flat uint8 grid
+    """
+    variant = get_variant(variant)
+    rng = np.random.default_rng() if rng is None else rng
+    while True:
+        try:
+            candidate_grid = CandidateGrid(np.zeros(variant.cells, dtype=np.uint8), variant)
+            for cell in rng.permutation(variant.cells)[:2 * variant.size].tolist():
+                if candidate_grid.values[cell]:
+                    continue
+                candidates = candidate_grid.candidates[cell]
+                values = [value for value in range(1, variant.size + 1) if candidates >> (value - 1) & 1]
+                candidate_grid.assign(cell, int(rng.choice(values)))
+        except Contradiction:
+            continue
+        result = bitmask_backtracking.solve(np.array(candidate_grid.values, dtype=np.uint8), variant)
+        if result.solved:
+            return result.grid.reshape(variant.cells)
+
+
+def has_other_solution(puzzle, cell, value, variant):
+    """
+    Incremental uniqueness check of a clue removal: the puzzle (with a unique solution before the
+    removal) still has a unique solution without the clue value at cell if no other value left
+    at cell leads to a solution. Every such value is a single solution search, cheaper than
+    counting the solutions of the whole puzzle.
+    :param puzzle: flat grid without the clue (puzzle[cell] == 0), restored before returning
+    :return: True if removing the clue breaks the uniqueness
+    """
+    used = set(puzzle[variant.peers[cell]].tolist())
+    try:
+        for other in range(1, variant.size + 1):
+            if other == value or other in used:
+                continue
+            puzzle[cell] = other
+            if bitmask_backtracking.count_solutions(puzzle, variant, limit=1):
+                return True
+        return False
+    finally:
+        puzzle[cell] = 0
+
+
+def remove_clues(solution, variant="normal", rng=None):
+    """
+    Removes the clues of a full grid in random order as long as the solution stays unique.
+    :return: flat uint8 puzzle, minimal (no clue can be removed without losing the uniqueness)
+    """
+    variant = get_variant(variant)
+    rng = np.random.default_rng() if rng is None else rng
+    puzzle = np.array(solution, dtype=np.uint8).reshape(variant.cells)
+    for cell in rng.permutation(variant.cells).tolist():
+        value = int(puzzle[cell])
+        puzzle[cell] = 0
+        if has_other_solution(puzzle, cell, value, variant):
+            puzzle[cell] = value
+    return puzzle
+
+
+def difficulty_score(puzzle, variant="normal", limit=None):
+    """
+    Difficulty score of a puzzle: search nodes of the bitmask backtracking without propagation
+    (fewest candidates first). It grows with the guesses a solver has to make.
+    :param limit: stop the search after limit nodes (the score is then limit), None for no limit
+    """
+    variant = get_variant(variant)
+    grid = np.asarray(puzzle).reshape(variant.size, variant.size)
+    budget = None if limit is None else Budget(node_limit=limit)
+    return bitmask_backtracking.solve(grid, variant, propagate=False, budget=budget).stats["nodes"]
+
+
+def generate(variant="normal", min_score=None, max_score=None, rng=None, attempts=50):
+    """
+    Generates a puzzle with a unique solution and a difficulty score in [min_score, max_score]:
+    the clues of a random grid are removed down to a minimal puzzle, and if its score is above
+    max_score clues of the solution are given back until it is not.
+    :param min_score: lowest difficulty_score, None for no bound
+    :param max_score: highest difficulty_score, None for no bound
+    :param rng: numpy Generator
+    :param attempts: random grids tried before giving up
+    :return: (puzzle, solution, score) as flat uint8 grids, None if no puzzle of the target difficulty was found
+    """
+    variant = get_variant(variant)
+    rng = np.random.default_rng() if rng is None else rng
+    # Scores above max_score do not need to be exact
+    limit = None if max_score is None else max_score + 1
+    for _ in range(attempts):
+        solution = random_grid(variant, rng)
+        puzzle = remove_clues(solution, variant, rng)
+        score = difficulty_score(puzzle, variant, limit)
+        if max_score is not None and score > max_score:
+            for cell in rng.permutation(np.flatnonzero(puzzle == 0)).tolist():
+                puzzle[cell] = solution[cell]
+                score = difficulty_score(puzzle, variant, limit)
+                if score <= max_score:
+                    break
+        if min_score is None or score >= min_score:
+            return puzzle, solution, score
+    return None
+
+
+def _generate(task):
+    # Worker of generate_many: one puzzle from its own seeded generator
+    variant, min_score, max_score, seed, index = task
+    return generate(variant, min_score, max_score, np.random.default_rng([seed, index]))
+
+
+def generate_many(count, variant="normal", min_score=None, max_score=None, workers=None, seed=None, chunksize=4):
+    """
+    Generates count distinct puzzles (no two equivalent under the symmetries of the variant, see
+    solution_cache.canonical_form) on a pool of worker processes. With a seed the puzzles are reproducible.
+    :param workers: number of worker processes (defaults to the number of cores)
+    :return: generator of (puzzle, solution, score) tuples of flat uint8 grids
+    """
+    variant = get_variant(variant)
+    seed = int(np.random.SeedSequence().entropy) if seed is None else seed
+    seen = set()
+    index = 0
+    with multiprocessing.Pool(workers) as pool:
+        while len(seen) < count:
+            # One round of tasks for the missing puzzles (duplicates and failed attempts are made up by the next round)
+            tasks = [(variant.name, min_score, max_score, seed, index + offset) for offset in range(count - len(seen))]
+            index += len(tasks)
+            generated_count = 0
+            for generated in pool.imap(_generate, tasks, chunksize):
+                if generated is None:
+                    continue
+                generated_count += 1
+                key = canonical_form(generated[0], variant)[0]
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield generated
+                if len(seen) == count:
+                    return
+            if not generated_count:
+                raise RuntimeError(f"No puzzle with a score in [{min_score}, {max_score}] found for variant {variant.name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate puzzles with a unique solution, one '<81 characters> <score>' line each")
+    parser.add_argument("count", type=int)
+    parser.add_argument("-o", "--output", default="-", help="puzzle file (.gz/.bz2 to compress), '-' for stdout")
+    parser.add_argument("--variant", default="normal", choices=sorted(VARIANTS))
+    parser.add_argument("--min-score", type=int, default=None, help="lowest difficulty score (search nodes)")
+    parser.add_argument("--max-score", type=int, default=None, help="highest difficulty score (search nodes)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    target = open_puzzle_file(args.output, "wt")
+    try:
+        for puzzle, _, score in generate_many(args.count, args.variant, args.min_score, args.max_score,
+                                              args.workers, args.seed):
+            target.write(f"{format_grid(puzzle)} {score}\n")
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
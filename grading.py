@@ -0,0 +1,134 @@
+import argparse
+import multiprocessing
+import sys
+from collections import Counter
+
+from propagation import TECHNIQUES, CandidateGrid, Contradiction
+from puzzle_io import format_grid, open_puzzle_file, read_puzzles
+from variants import VARIANTS, get_variant
+
+# CandidateGrid method of every technique of the ladder (propagation.TECHNIQUES, from the easiest)
+METHODS = dict(naked_single="naked_singles", hidden_single="hidden_singles", locked_candidates="locked_candidates",
+               naked_pair="naked_pairs", hidden_pair="hidden_pairs", naked_triple="naked_triples",
+               hidden_triple="hidden_triples", x_wing="x_wing", swordfish="swordfish", chain="chains")
+
+# Difficulty level of a puzzle by the hardest technique it needs
+LEVELS = dict(naked_single="easy", hidden_single="easy", locked_candidates="medium", naked_pair="medium",
+              hidden_pair="medium", naked_triple="hard", hidden_triple="hard", x_wing="hard",
+              swordfish="expert", chain="expert")
+
+# Grade of the puzzles the ladder does not solve and of the contradictory ones
+UNSOLVED = "unsolved"
+INVALID = "invalid"
+
+
+class Grade:
+    """
+    Grade of a puzzle.
+    :param level: "easy", "medium", "hard", "expert" (see LEVELS), UNSOLVED if the techniques of the
+                  ladder do not solve the puzzle or INVALID if the clues are contradictory
+    :param hardest: hardest technique used (None if nothing was needed)
+    :param steps: techniques applied (every application can place or eliminate several candidates)
+    :param counts: technique -> placements/eliminations
+    """
+    __slots__ = ("level", "hardest", "steps", "counts")
+
+    def __init__(self, level, hardest, steps, counts):
+        self.level = level
+        self.hardest = hardest
+        self.steps = steps
+        self.counts = counts
+
+    @property
+    def solved(self):
+        return self.level not in (UNSOLVED, INVALID)
+
+    def as_dict(self):
+        return dict(level=self.level, hardest=self.hardest, steps=self.steps, counts=dict(self.counts))
+
+    def __repr__(self):
+        return f"Grade(level={self.level!r}, hardest={self.hardest!r}, steps={self.steps})"
+
+
+def grade(puzzle, variant="normal"):
+    """
+    Grades a puzzle with the human techniques, without search: the easiest technique that changes
+    the candidate grid is applied, then the ladder starts again from the singles, until the puzzle
+    is solved or no technique applies.
+    :param puzzle: size x size grid of integers (0 represents an empty cell)
+    :param variant: name of a registered variant or a Variant
+    :return: Grade
+    """
+    hardest = -1
+    steps = 0
+    try:
+        candidate_grid = CandidateGrid(puzzle, get_variant(variant))
+        techniques = [getattr(candidate_grid, METHODS[technique]) for technique in TECHNIQUES]
+        while not candidate_grid.solved:
+            for index, technique in enumerate(techniques):
+                if technique():
+                    steps += 1
+                    hardest = max(hardest, index)
+                    break
+            else:
+                break
+    except Contradiction:
+        return Grade(INVALID, None, steps, {})
+
+    counts = {technique: count for technique, count in candidate_grid.counts.items() if count}
+    name = TECHNIQUES[hardest] if hardest >= 0 else None
+    if not candidate_grid.solved:
+        return Grade(UNSOLVED, name, steps, counts)
+    return Grade(LEVELS[name] if name is not None else "easy", name, steps, counts)
+
+
+_worker_variant = None
+
+def _init_worker(variant):
+    global _worker_variant
+    _worker_variant = get_variant(variant)
+
+
+def _grade(puzzle):
+    return grade(puzzle, _worker_variant)
+
+
+def _grade_with_puzzle(puzzle):
+    return puzzle, grade(puzzle, _worker_variant)
+
+
+def grade_many(puzzles, variant="normal", workers=None, chunksize=16, with_puzzles=False):
+    """
+    Grades an iterable of puzzles on a pool of worker processes.
+    :param workers: number of worker processes (defaults to the number of cores)
+    :param with_puzzles: yield (puzzle, Grade) tuples, a stream of puzzles then does not have to be kept
+    :return: generator of Grades (or (puzzle, Grade) tuples) in the order of the puzzles
+    """
+    get_variant(variant)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(variant,)) as pool:
+        yield from pool.imap(_grade_with_puzzle if with_puzzles else _grade, puzzles, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a file of puzzles with the human techniques, "
+                                                 "one '<81 characters> <level> <hardest technique> <steps>' line each")
+    parser.add_argument("input", help="puzzle file, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="grade file (.gz/.bz2 to compress), '-' for stdout")
+    parser.add_argument("--variant", default="normal", choices=sorted(VARIANTS))
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    levels = Counter()
+    target = open_puzzle_file(args.output, "wt")
+    try:
+        for puzzle, puzzle_grade in grade_many(read_puzzles(args.input), args.variant, args.workers, with_puzzles=True):
+            levels[puzzle_grade.level] += 1
+            target.write(f"{format_grid(puzzle)} {puzzle_grade.level} {puzzle_grade.hardest or '-'} {puzzle_grade.steps}\n")
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    print(", ".join(f"{level}: {count}" for level, count in levels.most_common()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
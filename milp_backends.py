@@ -0,0 +1,211 @@
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pulp as plp
+
+from profiling import NULL_PROFILE
+from results import INFEASIBLE, SOLVED
+
+# scipy.optimize.milp status -> PuLP status
+SCIPY_STATUS = {
+    0: plp.LpStatusOptimal,
+    1: plp.LpStatusNotSolved,   # iteration or time limit reached
+    2: plp.LpStatusInfeasible,
+    3: plp.LpStatusUnbounded,
+}
+
+# PuLP status -> results.SolveResult status (NOT_SOLVED for the others)
+RESULT_STATUS = {
+    plp.LpStatusOptimal: SOLVED,
+    plp.LpStatusInfeasible: INFEASIBLE,
+}
+
+
+class SCIPY_HIGHS(plp.LpSolver):
+    """
+    PuLP solver that runs HiGHS in-process through scipy.optimize.milp.
+    The problem is handed over as a sparse matrix: no temporary .lp/.mps file,
+    no subprocess and no solution file to parse.
+    """
+    name = "SCIPY_HIGHS"
+
+    def available(self):
+        return True
+
+    def solve_vector(self, lp, variables=None, profile=NULL_PROFILE):
+        """
+        Solves lp and hands the solution back as a numpy vector, without touching the PuLP variables.
+        :param variables: order of the variables in the returned vector (lp.variables() if None),
+                          must contain every variable of lp
+        :param profile: profiling.SolveProfile receiving the "matrix" and "milp" phases and the model size
+        :return: (status, x) with x None if the solver found no solution
+        """
+        # scipy is imported on the first solve so that importing the solver modules stays cheap
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import csr_matrix
+
+        variables = lp.variables() if variables is None else variables
+        if not variables:
+            return plp.LpStatusOptimal, np.zeros(0)
+
+        with profile.phase("matrix"):
+            index = {var: position for position, var in enumerate(variables)}
+
+            # Objective (scipy always minimizes)
+            objective = np.zeros(len(variables))
+            for var, coefficient in lp.objective.items():
+                objective[index[var]] = coefficient * lp.sense
+
+            # Constraints as one CSR matrix with row bounds
+            indptr, indices, data = [0], [], []
+            row_lower, row_upper = [], []
+            for constraint in lp.constraints.values():
+                for var, coefficient in constraint.items():
+                    indices.append(index[var])
+                    data.append(coefficient)
+                indptr.append(len(indices))
+                rhs = -constraint.constant
+                row_lower.append(rhs if constraint.sense != plp.LpConstraintLE else -np.inf)
+                row_upper.append(rhs if constraint.sense != plp.LpConstraintGE else np.inf)
+            A = csr_matrix((data, indices, indptr), shape=(len(row_lower), len(variables)))
+
+            lower = np.array([-np.inf if var.lowBound is None else var.lowBound for var in variables], dtype=float)
+            upper = np.array([np.inf if var.upBound is None else var.upBound for var in variables], dtype=float)
+            integrality = np.array([var.cat == plp.LpInteger for var in variables], dtype=float)
+        if profile.enabled:
+            profile.model.update(rows=A.shape[0], columns=A.shape[1], nonzeros=A.nnz)
+
+        options = {"disp": bool(self.msg)}
+        if self.timeLimit is not None:
+            options["time_limit"] = self.timeLimit
+        if self.optionsDict.get("maxNodes") is not None:
+            options["node_limit"] = self.optionsDict["maxNodes"]
+        with profile.phase("milp"):
+            result = milp(objective, constraints=LinearConstraint(A, row_lower, row_upper) if len(row_lower) else None,
+                          integrality=integrality, bounds=Bounds(lower, upper), options=options)
+
+        status = SCIPY_STATUS.get(result.status, plp.LpStatusUndefined)
+        lp.assignStatus(status)
+        return status, result.x
+
+    def actualSolve(self, lp, **kwargs):
+        variables = lp.variables()
+        status, x = self.solve_vector(lp, variables)
+        if x is not None:
+            lp.assignVarsVals({var.name: value for var, value in zip(variables, x)})
+        return status
+
+
+# Backend name -> factory of the PuLP solver, called with msg
+BACKENDS = {
+    "cbc": lambda msg: plp.PULP_CBC_CMD(msg=msg),          # CBC subprocess through temporary files
+    "highs": lambda msg: SCIPY_HIGHS(msg=msg),             # HiGHS in-process through scipy
+    "highspy": lambda msg: plp.HiGHS(msg=msg),             # HiGHS in-process through highspy (optional dependency)
+}
+
+# Backend used when none is given, configurable with the SUDOKU_MILP_BACKEND environment variable
+DEFAULT_BACKEND = os.environ.get("SUDOKU_MILP_BACKEND", "highs")
+
+
+def set_default_backend(name):
+    global DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown MILP backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    DEFAULT_BACKEND = name
+
+
+def get_backend(name=None, msg=False):
+    """
+    :param name: backend name (one of BACKENDS), DEFAULT_BACKEND if None
+    :param msg: let the backend print its log
+    :return: a PuLP solver object, to be passed to prob.solve()
+    """
+    name = DEFAULT_BACKEND if name is None else name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown MILP backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    solver = BACKENDS[name](msg)
+    if not solver.available():
+        raise RuntimeError(f"MILP backend {name!r} is not available in this environment")
+    return solver
+
+
+def model_size(prob):
+    # Rows, columns and nonzeros of the constraint matrix of a PuLP problem
+    return dict(rows=len(prob.constraints), columns=len(prob.variables()),
+                nonzeros=sum(len(constraint) for constraint in prob.constraints.values()))
+
+
+@contextmanager
+def backend_limits(backend, budget):
+    """
+    Hands the remaining time and the node limit of a budget.Budget to a PuLP solver for the
+    duration of a solve (its timeLimit and maxNodes option), the limits of the solver are restored afterwards.
+    """
+    if budget is None:
+        yield
+        return
+    time_limit, node_limit = backend.timeLimit, backend.optionsDict.get("maxNodes")
+    remaining = budget.remaining()
+    if remaining is not None:
+        backend.timeLimit = remaining if time_limit is None else min(remaining, time_limit)
+    if budget.node_limit is not None:
+        backend.optionsDict["maxNodes"] = budget.node_limit if node_limit is None else min(budget.node_limit, node_limit)
+    try:
+        yield
+    finally:
+        backend.timeLimit = time_limit
+        if node_limit is None:
+            backend.optionsDict.pop("maxNodes", None)
+        else:
+            backend.optionsDict["maxNodes"] = node_limit
+
+
+def solve_vector(prob, backend, variables, profile=NULL_PROFILE, budget=None):
+    """
+    Solves prob with a backend and returns the values of variables as a numpy array in the given order.
+    In-process backends hand their solution vector over directly; the others are solved through
+    PuLP and their values read back once.
+    :param profile: profiling.SolveProfile receiving the solver phases and the model size. The "solve" phase
+                    of the command line backends (CBC) covers writing the model file, the solver
+                    subprocess and reading its solution file, which PuLP runs as one step
+    :param budget: started budget.Budget whose limits are passed to the backend, the solver is not
+                   started if it is already used up or cancelled
+    :return: (status, x) with x None if the solver found no solution (status LpStatusNotSolved when stopped by the budget)
+    """
+    if budget is not None and budget.exhausted():
+        return plp.LpStatusNotSolved, None
+    if hasattr(backend, "solve_vector"):
+        with backend_limits(backend, budget):
+            return backend.solve_vector(prob, variables, profile)
+    if profile.enabled:
+        profile.model.update(model_size(prob))
+    with profile.phase("solve"), backend_limits(backend, budget):
+        status = prob.solve(backend)
+    with profile.phase("read_values"):
+        x = np.array([var.varValue for var in variables], dtype=float)
+    if np.isnan(x).any():
+        return status, None
+    return status, x
+
+
+def decode_grid(x, cells=None, values=None, grid=None, size=9):
+    """
+    Decodes a solution vector into a size x size grid with a reshape and an argmax over the value axis.
+    Values are compared with 0.5, so 0.9999999 from a solver still counts as 1.
+    :param x: values of all size^3 variables in (cell, value) order, or of the variables listed by cells/values
+    :param cells: flat cell index of every entry of x (None if x holds all the variables)
+    :param values: value (1 to size) of every entry of x
+    :param grid: flat puzzle whose given cells are kept
+    :param size: number of rows (and values) of the board
+    :return: size x size grid (0 where no value reaches 0.5)
+    """
+    if cells is None:
+        dense = np.asarray(x, dtype=float).reshape(size * size, size)
+    else:
+        dense = np.zeros((size * size, size))
+        dense[cells, np.asarray(values) - 1] = x
+    solution = np.where(dense.max(axis=1) > 0.5, dense.argmax(axis=1) + 1, 0)
+    if grid is not None:
+        solution = np.where(grid != 0, grid, solution)
+    return solution.reshape(size, size)
@@ -0,0 +1,143 @@
+from time import perf_counter
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csr_matrix
+
+from clue_propagation import propagate_clues
+from milp_backends import RESULT_STATUS, SCIPY_STATUS, decode_grid
+from profiling import finish_profile, start_profile
+from propagation import propagate
+from results import INFEASIBLE, NOT_SOLVED, SOLVED, TIMEOUT, make_result
+from variants import get_variant
+
+
+def build_constraint_matrix(variant="normal"):
+    """
+    Builds the sparse equality system A x = b of the ILP formulation in one shot with index arithmetic.
+    Variable cell*size + value-1 is 1 if value is filled at cell (row*size + col), i.e. x.reshape(size, size, size).
+    Rows 0..cells-1: only one value is filled for a cell.
+    Rows cells + region*size + value-1: value is filled only once in the region (rows, columns, boxes, extra regions).
+    :param variant: name of a registered variant or a Variant
+    :return: (A, b) with A a scipy.sparse CSR matrix and b a numpy array of ones
+    """
+    variant = get_variant(variant)
+    region_cells = variant.region_cells
+    regions = len(region_cells)
+    size, cells = variant.size, variant.cells
+    value_index = np.arange(size)
+
+    # Every row has exactly size nonzeros, so the CSR arrays are written directly
+    # CONSTRAINT 1: one row per cell covering its size value variables
+    cell_cols = np.arange(cells * size)
+    # CONSTRAINT 2: one row per (region, value) covering the value variable of the size cells of the region
+    region_cols = region_cells[:, None, :] * size + value_index[None, :, None]
+
+    indices = np.concatenate([cell_cols, region_cols.ravel()])
+    indptr = np.arange(0, len(indices) + 1, size)
+    A = csr_matrix((np.ones(len(indices)), indices, indptr), shape=(cells + regions * size, cells * size))
+    b = np.ones(A.shape[0])
+    return A, b
+
+
+class MilpSudokuSolver:
+    """
+    ILP Sudoku solver that hands the prebuilt sparse constraint matrix of the
+    variant straight to scipy.optimize.milp (HiGHS), without PuLP expressions.
+    Clues and the candidates removed by the propagation only change the variable bounds.
+    :param variant: name of a registered variant or a Variant
+    :param propagation: run the full constraint propagation (propagation.py) instead of the clue propagation
+    :param box_size: box size of the board (e.g. 5 for 25x25), the size of the variant if None
+    """
+    def __init__(self, variant="normal", propagation=True, box_size=None):
+        self.variant = get_variant(variant, box_size)
+        self.propagation = propagation
+        A, b = build_constraint_matrix(self.variant)
+        self.constraints = LinearConstraint(A, b, b)
+        # There is no objective function, only the constraints
+        self.objective = np.zeros(A.shape[1])
+        self.integrality = np.ones(A.shape[1])
+
+    def bounds(self, input_sudoku):
+        """
+        :return: (grid, bounds) with grid the flat grid after propagation and bounds the variable
+                 bounds of the puzzle, bounds is None if the puzzle is infeasible
+        """
+        presolve = propagate if self.propagation else propagate_clues
+        grid, candidates, feasible = presolve(input_sudoku, self.variant)
+        if not feasible:
+            return grid, None
+
+        # Given and propagated values are fixed to 1, eliminated values are fixed to 0
+        lower = np.zeros((self.variant.cells, self.variant.size))
+        given = np.flatnonzero(grid)
+        lower[given, grid[given] - 1] = 1
+        return grid, Bounds(lower.ravel(), candidates.ravel().astype(float))
+
+    def solve(self, input_sudoku, profile=None, budget=None):
+        """
+        :param input_sudoku: size x size grid of integers (0 represents an empty cell)
+        :param profile: profiling.SolveProfile receiving the "bounds", "milp" and "extract" phases and the model size
+        :param budget: budget.Budget of the solve, its remaining time and node limit are passed to HiGHS
+        :return: results.SolveResult with the solved grid, the scipy milp status in stats["solver_status"]
+                 (TIMEOUT if HiGHS stopped on the budget without a solution)
+        """
+        start = perf_counter()
+        profile = start_profile(profile, "milp")
+        if budget is not None:
+            budget.start()
+        status, grid, solver_status = self._solve(input_sudoku, profile, budget)
+        finish_profile(profile)
+        return make_result("milp", status, grid, self.variant.size, profile, start, solver_status=solver_status)
+
+    def _solve(self, input_sudoku, profile, budget):
+        # Returns (result status, solved grid or None, scipy milp status or None if milp did not run)
+        with profile.phase("bounds"):
+            grid, bounds = self.bounds(input_sudoku)
+        if bounds is None:
+            return INFEASIBLE, None, None
+        if grid.all():
+            # Solved by the propagation, HiGHS is not needed
+            return SOLVED, grid, None
+
+        if profile.enabled:
+            A = self.constraints.A
+            profile.model.update(rows=A.shape[0], columns=A.shape[1], nonzeros=A.nnz)
+        options = {}
+        if budget is not None:
+            if budget.exhausted():
+                return TIMEOUT, None, None
+            if budget.deadline is not None:
+                options["time_limit"] = budget.remaining()
+            if budget.node_limit is not None:
+                options["node_limit"] = budget.node_limit
+        with profile.phase("milp"):
+            result = milp(self.objective, constraints=self.constraints, integrality=self.integrality, bounds=bounds,
+                          options=options)
+        if result.x is None:
+            # Status 1: time or node limit reached
+            status = TIMEOUT if result.status == 1 else RESULT_STATUS.get(SCIPY_STATUS.get(result.status), NOT_SOLVED)
+            return status, None, result.status
+        with profile.phase("extract"):
+            return SOLVED, decode_grid(result.x, size=self.variant.size), result.status
+
+    def count_solutions(self, input_sudoku, limit=2):
+        """
+        Counts the solutions of a puzzle up to limit, adding a no-good cut row after every solution.
+        :return: number of solutions found (limit means limit or more)
+        """
+        grid, bounds = self.bounds(input_sudoku)
+        if bounds is None:
+            return 0
+        if grid.all():
+            return 1
+
+        cuts = []
+        while len(cuts) < limit:
+            result = milp(self.objective, constraints=[self.constraints] + cuts, integrality=self.integrality, bounds=bounds)
+            if result.x is None:
+                break
+            # The variables set to 1 cannot all be 1 again
+            chosen = (result.x > 0.5).astype(float)
+            cuts.append(LinearConstraint(chosen, -np.inf, chosen.sum() - 1))
+        return len(cuts)
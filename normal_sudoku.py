@@ -1,125 +1,295 @@
-import pulp as plp
-import matplotlib.pyplot as plt
-import numpy as np
-
-def solve_sudoku(input_sudoku):
-    # Create the linear programming problem
-    prob = plp.LpProblem("Sudoku_Solver")
-
-
-    # Set the objective function
-    # Sudoku works only on the constraints 
-    # There is no objective function that we are trying maximize or minimize.
-    # Set a dummy objective
-    objective = plp.lpSum(0)
-    prob.setObjective(objective)
-
-    rows = range(0,9)
-    cols = range(0,9)
-    grids = range(0,9)
-    values = range(1,10)
-
-    # Decision Variable/Target variable
-    grid_vars = plp.LpVariable.dicts("grid_value", (rows,cols,values), cat='Binary')
-
-    # CONSTRAINT 1: Constraint to ensure only one value is filled for a cell
-    for row in rows:
-        for col in cols:
-                prob.addConstraint(plp.LpConstraint(e=plp.lpSum([grid_vars[row][col][value] for value in values]),
-                                        sense=plp.LpConstraintEQ, rhs=1, name=f"constraint_sum_{row}_{col}"))
-
-
-    # CONSTRAINT 2: Constraint to ensure that values from 1 to 9 is filled only once in a row        
-    for row in rows:
-        for value in values:
-            prob.addConstraint(plp.LpConstraint(e=plp.lpSum([grid_vars[row][col][value]*value  for col in cols]),
-                                        sense=plp.LpConstraintEQ, rhs=value, name=f"constraint_uniq_row_{row}_{value}"))
-
-    # CONSTRAINT 3: Constraint to ensure that values from 1 to 9 is filled only once in a column        
-    for col in cols:
-        for value in values:
-            prob.addConstraint(plp.LpConstraint(e=plp.lpSum([grid_vars[row][col][value]*value  for row in rows]),
-                                        sense=plp.LpConstraintEQ, rhs=value, name=f"constraint_uniq_col_{col}_{value}"))
-
-
-    # CONSTRAINT 4: Constraint to ensure that values from 1 to 9 is filled only once in the 3x3 grid       
-    for grid in grids:
-        grid_row  = int(grid/3)
-        grid_col  = int(grid%3)
-
-        for value in values:
-            prob.addConstraint(plp.LpConstraint(e=plp.lpSum([grid_vars[grid_row*3+row][grid_col*3+col][value]*value  for col in range(0,3) for row in range(0,3)]),
-                                    sense=plp.LpConstraintEQ, rhs=value, name=f"constraint_uniq_grid_{grid}_{value}"))
-
-        
-    
-
-            
-    # Fill the prefilled values from input sudoku as constraints
-    for row in rows:
-        for col in cols:
-            if(input_sudoku[row][col] != 0):
-                prob.addConstraint(plp.LpConstraint(e=plp.lpSum([grid_vars[row][col][value]*value  for value in values]),
-                                        sense=plp.LpConstraintEQ, 
-                                        rhs=input_sudoku[row][col], 
-                                        name=f"constraint_prefilled_{row}_{col}"))
-                
-                    
-                    
-                    
-
-    # Solve the problem
-    prob.solve()               
-
-    print(f'Solution Status = {plp.LpStatus[prob.status]}')
-
-    # Code to extract the final solution grid
-    solution = np.zeros((9, 9), dtype=int)
-    for row in rows:
-        for col in cols:
-            for value in values:
-                if grid_vars[row][col][value].varValue == 1:
-                    solution[row][col] = value
-                    
-    return solution
-
-
-       
-normal_sudoku = np.array([
-                    [0,0,0, 0,0,0, 0,2,0],
-                    [0,2,0, 0,0,4, 5,0,0],
-                    [0,0,7, 0,0,3, 4,0,0],
-                # ----------------------
-                    [2,0,0, 1,0,0, 3,4,0],
-                    [6,4,0, 0,8,0, 0,5,9],
-                    [0,9,5, 0,0,2, 0,0,1],
-                # ----------------------
-                    [0,0,3, 4,0,0, 8,0,0],
-                    [0,0,9, 0,0,0, 0,1,0],
-                    [0,1,0, 0,0,0, 0,0,0]
-                ])
-
-solution = solve_sudoku(normal_sudoku)       
-
-# Plot the solved Sudoku grid
-fig, ax = plt.subplots(figsize=(6,6))
-ax.imshow(solution, cmap='binary', vmin=0, vmax=9)
-ax.set_xticks(np.arange(-.5, 9, 1))
-ax.set_yticks(np.arange(-.5, 9, 1))
-ax.grid(color='black', linestyle='-', linewidth=2)
-ax.tick_params(axis='both', length=0)
-
-# add the boundaries of the 3x3 squares
-for i in range(0, 10, 3):
-    ax.axhline(i-0.5, color='purple', linewidth=3)
-    ax.axvline(i-0.5, color='purple', linewidth=3)
-
-for i in range(9):
-    for j in range(9):
-        if normal_sudoku[i][j] != 0:
-            ax.text(j, i, normal_sudoku[i][j], color='blue', fontsize=16, ha='center', va='center')
-        else:
-            ax.text(j, i, int(solution[i][j]), color='red', fontsize=16, ha='center', va='center')
-            ax.add_patch(plt.Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='black', linewidth=2))
-plt.axis('off')
-plt.show()
+import logging
+from time import perf_counter
+
+import pulp as plp
+import numpy as np
+
+from clue_propagation import propagate_clues
+from milp_backends import RESULT_STATUS, decode_grid, get_backend, model_size, solve_vector
+from profiling import NULL_PROFILE, finish_profile, start_profile
+from propagation import propagate
+from results import NOT_SOLVED, TIMEOUT, make_result
+from variants import get_variant
+
+logger = logging.getLogger(__name__)
+
+
+class SudokuSolver:
+    """
+    Reusable ILP Sudoku solver.
+    The variables and the structural model (cell constraints and the regions of
+    the variant from the registry) are built once. Every puzzle
+    either gets a small residual model of its free cells after propagation
+    or only fixes the bounds of its clue variables in the full model.
+    :param variant: name of a registered variant or a Variant
+    :param msg: print the solver log on stdout, off for library use (the solution status of every
+                puzzle is logged at INFO level)
+    :param backend: MILP backend name (see milp_backends.BACKENDS), the configurable default if None
+    :param propagation: run the full constraint propagation (propagation.py) before building the
+                        residual model instead of removing only the candidates ruled out by the clues
+    :param box_size: box size of the board (e.g. 4 for 16x16), the size of the variant if None
+    :param profile: profiling.SolveProfile receiving the "variables" and "constraints" phases of the
+                    model build and the size of the full model
+    """
+    def __init__(self, variant="normal", msg=False, backend=None, propagation=True, box_size=None, profile=None):
+        profile = start_profile(profile, "ilp")
+        self.variant = get_variant(variant, box_size)
+        self.msg = msg
+        self.propagation = propagation
+        self.backend = get_backend(backend, msg)
+
+        # Create the linear programming problem
+        self.prob = plp.LpProblem("Sudoku_Solver")
+
+        # Set the objective function
+        # Sudoku works only on the constraints 
+        # There is no objective function that we are trying maximize or minimize.
+        # Set a dummy objective
+        objective = plp.lpSum(0)
+        self.prob.setObjective(objective)
+
+        size = self.variant.size
+        rows = cols = range(size)
+        values = range(1, size + 1)
+
+        # Decision Variable/Target variable
+        with profile.phase("variables"):
+            self.grid_vars = plp.LpVariable.dicts("grid_value", (rows,cols,values), cat='Binary')
+            grid_vars = self.grid_vars
+            # The same variables in (row, col, value) order, the order of the solution vectors
+            self.variables = [grid_vars[row][col][value] for row in rows for col in cols for value in values]
+            variables = self.variables
+
+        # The expressions are built directly from (variable, coefficient) pairs: lpSum over
+        # products costs a temporary expression per term, too slow for the size^3 variables of 25x25 boards
+        with profile.phase("constraints"):
+            # CONSTRAINT 1: Constraint to ensure only one value is filled for a cell
+            for cell in range(self.variant.cells):
+                row, col = divmod(cell, size)
+                self.prob.addConstraint(plp.LpConstraint(e=plp.LpAffineExpression([(var, 1) for var in variables[cell*size:(cell+1)*size]]),
+                                        sense=plp.LpConstraintEQ, rhs=1, name=f"constraint_sum_{row}_{col}"))
+
+            # CONSTRAINT 2: Constraint to ensure that every value is filled only once in every region
+            # of the variant (rows, columns, boxes and the extra regions)
+            for region_index, cells in enumerate(self.variant.region_cells.tolist()):
+                for value in values:
+                    self.prob.addConstraint(plp.LpConstraint(e=plp.LpAffineExpression([(variables[cell*size + value-1], 1) for cell in cells]),
+                                            sense=plp.LpConstraintEQ, rhs=1, name=f"constraint_uniq_{region_index}_{value}"))
+
+        # Variables whose lower bound is fixed to 1 by the clues of the current puzzle
+        self.fixed_vars = []
+
+        if profile.enabled:
+            profile.model.update(model_size(self.prob))
+        finish_profile(profile)
+
+    def release_clues(self):
+        # Release the clues of the previous puzzle
+        for var in self.fixed_vars:
+            var.lowBound = 0
+        self.fixed_vars = []
+
+    def set_clues(self, input_sudoku):
+        # Returns False (without fixing any bound) if a clue is outside 1..size
+        self.release_clues()
+        grid = np.asarray(input_sudoku).reshape(self.variant.size, self.variant.size)
+        if ((grid < 0) | (grid > self.variant.size)).any():
+            return False
+
+        # Fill the prefilled values from input sudoku by fixing their variables to 1
+        for row in range(self.variant.size):
+            for col in range(self.variant.size):
+                if(input_sudoku[row][col] != 0):
+                    var = self.grid_vars[row][col][int(input_sudoku[row][col])]
+                    var.lowBound = 1
+                    self.fixed_vars.append(var)
+        return True
+
+    def build_residual_problem(self, input_sudoku, profile=NULL_PROFILE):
+        """
+        Builds the model of the free cells only, after the propagation.
+        Given and propagated cells, eliminated candidates and constraints
+        already satisfied never reach the solver (nor does a puzzle solved by the propagation).
+        :param profile: profiling.SolveProfile receiving the "propagate" and "residual_model" phases
+        :return: (prob, grid, free_cells, free_values, free_vars) where prob is None if the clues are
+                 contradictory and free_cells/free_values/free_vars describe every variable of the model
+        """
+        self.release_clues()
+        presolve = propagate if self.propagation else propagate_clues
+        with profile.phase("propagate"):
+            grid, candidates, feasible = presolve(input_sudoku, self.variant)
+        if not feasible:
+            return None, grid, None, None, []
+        with profile.phase("residual_model"):
+            return self._residual_problem(grid, candidates)
+
+    def _residual_problem(self, grid, candidates):
+        # Residual model of the free cells of a propagated grid, see build_residual_problem
+        size = self.variant.size
+        prob = plp.LpProblem("Sudoku_Solver_Residual")
+        prob.setObjective(plp.lpSum(0))
+        free = grid == 0
+        free_cells, free_values = np.nonzero(candidates & free[:, None])
+        free_values = free_values + 1
+        free_vars = [self.variables[cell*size + value-1] for cell, value in zip(free_cells, free_values)]
+
+        # CONSTRAINT 1: Only one of the remaining candidates is filled for an empty cell
+        starts = np.flatnonzero(np.diff(free_cells, prepend=-1))
+        for start, end in zip(starts, list(starts[1:]) + [len(free_cells)]):
+            row, col = divmod(int(free_cells[start]), size)
+            prob.addConstraint(plp.LpConstraint(e=plp.LpAffineExpression([(var, 1) for var in free_vars[start:end]]),
+                                    sense=plp.LpConstraintEQ, rhs=1, name=f"constraint_sum_{row}_{col}"))
+
+        # CONSTRAINT 2: Every value missing from a region is filled once in its empty cells
+        for region_index, cells in enumerate(self.variant.region_cells):
+            region_free = cells[free[cells]]
+            missing = np.setdiff1d(np.arange(1, size + 1), grid[cells])
+            for value in missing:
+                value_cells = region_free[candidates[region_free, value-1]]
+                if len(value_cells) == 0:
+                    return None, grid, None, None, []
+                prob.addConstraint(plp.LpConstraint(e=plp.LpAffineExpression([(self.variables[cell*size + value-1], 1) for cell in value_cells]),
+                                        sense=plp.LpConstraintEQ, rhs=1, name=f"constraint_uniq_{region_index}_{value}"))
+
+        return prob, grid, free_cells, free_values, free_vars
+
+    def solve(self, input_sudoku, presolve=True, profile=None, budget=None):
+        """
+        :param input_sudoku: size x size grid of integers (0 represents an empty cell)
+        :param presolve: propagate and solve only the residual model instead of the full warm model
+        :param profile: profiling.SolveProfile receiving the duration of every phase ("propagate",
+                        "residual_model" or "set_clues", the backend phases, "extract") and the model size
+        :param budget: budget.Budget of the solve, its remaining time and node limit are passed to the backend
+        :return: results.SolveResult with the solved grid, the PuLP status in stats["solver_status"]
+                 (TIMEOUT if the backend stopped on the budget without a solution)
+        """
+        start = perf_counter()
+        profile = start_profile(profile, "ilp")
+        if budget is not None:
+            budget.start()
+        status, grid = self._solve(input_sudoku, presolve, profile, budget)
+        finish_profile(profile)
+        logger.info("Solution Status = %s", plp.LpStatus[status])
+        result_status = RESULT_STATUS.get(status, NOT_SOLVED)
+        if result_status == NOT_SOLVED and budget is not None:
+            result_status = TIMEOUT
+        return make_result("ilp", result_status, grid, self.variant.size, profile, start,
+                           solver_status=plp.LpStatus[status])
+
+    def _solve(self, input_sudoku, presolve, profile, budget):
+        # Returns (PuLP status, solved grid or None)
+        size = self.variant.size
+        if not presolve:
+            with profile.phase("set_clues"):
+                if not self.set_clues(input_sudoku):
+                    return plp.LpStatusInfeasible, None
+
+            # Solve the problem, the solution comes back as a vector in (row, col, value) order
+            status, x = solve_vector(self.prob, self.backend, self.variables, profile, budget)
+            if status != plp.LpStatusOptimal or x is None:
+                return status, None
+            with profile.phase("extract"):
+                return status, decode_grid(x, size=size)
+
+        prob, grid, free_cells, free_values, free_vars = self.build_residual_problem(input_sudoku, profile)
+        x = np.zeros(0)
+        if prob is None:
+            status = plp.LpStatusInfeasible
+        elif not free_vars:
+            # Every cell is given or placed by the propagation, there is nothing left for the solver
+            status = plp.LpStatusOptimal
+        else:
+            # Solve the problem, the solution comes back as a vector in free_vars order
+            status, x = solve_vector(prob, self.backend, free_vars, profile, budget)
+
+        if status != plp.LpStatusOptimal or x is None:
+            return status, None
+
+        # Final solution grid: given cells plus the free variables set to 1
+        with profile.phase("extract"):
+            return status, decode_grid(x, free_cells, free_values, grid, size)
+
+    def count_solutions(self, input_sudoku, limit=2, presolve=True):
+        """
+        Counts the solutions of a puzzle up to limit. After every solution a no-good cut
+        (the variables set to 1 cannot all be 1 again) is added to the model, which is then
+        solved again, until it becomes infeasible or limit solutions are found.
+        :param input_sudoku: size x size grid of integers (0 represents an empty cell)
+        :param limit: stop after this many solutions
+        :param presolve: add the cuts to the residual model of the puzzle instead of the full warm model
+        :return: number of solutions found (limit means limit or more)
+        """
+        if presolve:
+            prob, _, _, _, variables = self.build_residual_problem(input_sudoku)
+            if prob is None:
+                return 0
+            if not variables:
+                return 1
+        else:
+            if not self.set_clues(input_sudoku):
+                return 0
+            prob, variables = self.prob, self.variables
+
+        cuts = []
+        try:
+            while len(cuts) < limit:
+                status, x = solve_vector(prob, self.backend, variables)
+                if status != plp.LpStatusOptimal or x is None:
+                    break
+                chosen = [var for var, value in zip(variables, x) if value > 0.5]
+                name = f"no_good_{len(cuts)}"
+                prob.addConstraint(plp.LpConstraint(e=plp.lpSum(chosen), sense=plp.LpConstraintLE,
+                                        rhs=len(chosen) - 1, name=name))
+                cuts.append(name)
+        finally:
+            if not presolve:
+                # The warm model keeps only its structural constraints
+                for name in cuts:
+                    del prob.constraints[name]
+
+        logger.info("Solutions found = %d", len(cuts))
+        return len(cuts)
+
+
+# The structural model is built on the first call and reused afterwards
+_solver = None
+
+def solve_sudoku(input_sudoku, profile=None, budget=None):
+    global _solver
+    if _solver is None:
+        _solver = SudokuSolver()
+    return _solver.solve(input_sudoku, profile=profile, budget=budget)
+
+
+def count_solutions(input_sudoku, limit=2):
+    global _solver
+    if _solver is None:
+        _solver = SudokuSolver()
+    return _solver.count_solutions(input_sudoku, limit)
+
+
+       
+if __name__ == "__main__":
+    from board import Board
+    from rendering import plot_solution
+
+    logging.basicConfig(level=logging.INFO)
+
+    normal_sudoku = Board([
+                        [0,0,0, 0,0,0, 0,2,0],
+                        [0,2,0, 0,0,4, 5,0,0],
+                        [0,0,7, 0,0,3, 4,0,0],
+                    # ----------------------
+                        [2,0,0, 1,0,0, 3,4,0],
+                        [6,4,0, 0,8,0, 0,5,9],
+                        [0,9,5, 0,0,2, 0,0,1],
+                    # ----------------------
+                        [0,0,3, 4,0,0, 8,0,0],
+                        [0,0,9, 0,0,0, 0,1,0],
+                        [0,1,0, 0,0,0, 0,0,0]
+                    ])
+
+    result = solve_sudoku(normal_sudoku)
+
+    # Plot the solved Sudoku grid
+    plot_solution(normal_sudoku, result.grid, "normal")
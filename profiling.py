@@ -0,0 +1,98 @@
+from contextlib import nullcontext
+from time import perf_counter
+
+
+class _Phase:
+    # Context manager adding the time spent in its block to a phase of a profile
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        phases = self.profile.phases
+        phases[self.name] = phases.get(self.name, 0.0) + perf_counter() - self.start
+
+
+class SolveProfile:
+    """
+    Instrumentation of one solve (or one model build): duration of every phase in seconds,
+    size of the model handed to the solver and counters of the search engines.
+    Pass one to an engine to have it filled, e.g. solver.solve(puzzle, profile=SolveProfile()).
+    :param engine: name of the engine, set by the engine if None
+    """
+    enabled = True
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.phases = {}    # phase -> seconds
+        self.model = {}     # rows, columns, nonzeros of the model
+        self.counters = {}  # nodes, backtracks, propagation counts, ...
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return dict(engine=self.engine, phases=dict(self.phases), model=dict(self.model), counters=dict(self.counters))
+
+    def __repr__(self):
+        return f"SolveProfile({self.as_dict()!r})"
+
+
+class _NullProfile:
+    # Stand-in used when nothing is profiled: every call is a no-op
+    enabled = False
+    engine = None
+    _context = nullcontext()
+
+    def phase(self, name):
+        return self._context
+
+    def count(self, name, value):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
+
+# Callbacks called with every filled profile, see add_metrics_callback
+_callbacks = []
+
+
+def add_metrics_callback(callback):
+    """
+    Registers a metrics callback: from now on every solve is profiled and callback(profile)
+    is called with its SolveProfile once the solve is done.
+    """
+    _callbacks.append(callback)
+
+
+def remove_metrics_callback(callback):
+    _callbacks.remove(callback)
+
+
+def start_profile(profile, engine):
+    """
+    :param profile: SolveProfile given by the caller or None
+    :return: the profile to fill: the given one, a new one if a metrics callback is registered, NULL_PROFILE otherwise
+    """
+    if profile is None:
+        if not _callbacks:
+            return NULL_PROFILE
+        profile = SolveProfile()
+    if profile.engine is None:
+        profile.engine = engine
+    return profile
+
+
+def finish_profile(profile):
+    # Hands a filled profile to the metrics callbacks
+    if profile.enabled:
+        for callback in _callbacks:
+            callback(profile)
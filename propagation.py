@@ -0,0 +1,405 @@
+from itertools import combinations
+
+import numpy as np
+
+from variants import get_variant
+
+# Candidate masks: bit value-1 is set if value is possible, mask.bit_count() is the number of candidates
+# and bit.bit_length() the value of a single candidate, for any board size
+
+
+class Contradiction(Exception):
+    # Raised when a cell loses its last candidate or a value has no place left in a region
+    pass
+
+
+class UnitLayout:
+    """
+    Lookups of a variant used by the propagation, as plain tuples for fast Python loops.
+    Built once per variant (see get_layout).
+    """
+    def __init__(self, variant):
+        self.size = variant.size
+        self.cells = variant.cells
+        # Mask with every value of the board
+        self.all_values = (1 << variant.size) - 1
+        self.units = tuple(tuple(int(cell) for cell in cells) for cells in variant.region_cells)
+        self.cell_units = variant.cell_regions
+        self.peers = tuple(tuple(int(peer) for peer in peers) for peers in variant.peers)
+        self.peer_sets = tuple(frozenset(peers) for peers in self.peers)
+        # Rows and columns are the first 2*size regions of every variant
+        self.rows = self.units[:self.size]
+        self.cols = self.units[self.size:2 * self.size]
+
+        # Pairs of regions sharing at least 2 cells (box/row, box/column, extra regions...), in both
+        # directions: (shared cells, rest of the first region, rest of the second region)
+        self.intersections = []
+        for first, second in combinations(self.units, 2):
+            shared = set(first) & set(second)
+            if len(shared) < 2:
+                continue
+            first_rest = tuple(cell for cell in first if cell not in shared)
+            second_rest = tuple(cell for cell in second if cell not in shared)
+            self.intersections.append((tuple(shared), first_rest, second_rest))
+            self.intersections.append((tuple(shared), second_rest, first_rest))
+
+
+_layouts = {}
+
+def get_layout(variant):
+    variant = get_variant(variant)
+    if variant.name not in _layouts:
+        _layouts[variant.name] = UnitLayout(variant)
+    return _layouts[variant.name]
+
+
+# Techniques from the easiest: propagate() tries the singles, locked candidates, pairs and X-Wing,
+# the grader (grading.py) every one of them
+TECHNIQUES = ("naked_single", "hidden_single", "locked_candidates", "naked_pair", "hidden_pair",
+              "naked_triple", "hidden_triple", "x_wing", "swordfish", "chain")
+
+
+class CandidateGrid:
+    """
+    Candidate grid with one bitmask per cell (bit value-1 set if value is still possible).
+    Placing a value removes it from the peers; cells reduced to one candidate are queued
+    as naked singles and every changed region is queued for the hidden single check.
+    :param puzzle: size x size grid of integers (0 represents an empty cell)
+    :param variant: name of a registered variant or a Variant
+    :raises Contradiction: if the clues contradict each other
+    """
+    def __init__(self, puzzle, variant="normal"):
+        self.layout = get_layout(variant)
+        self.candidates = [self.layout.all_values] * self.layout.cells
+        self.values = [0] * self.layout.cells
+        # Cells with a single candidate not yet placed and regions changed since their last hidden single check
+        self.pending = []
+        self.dirty_units = set(range(len(self.layout.units)))
+        # Number of placements/eliminations made by every technique
+        self.counts = dict.fromkeys(TECHNIQUES, 0)
+
+        grid = np.asarray(puzzle).reshape(self.layout.cells)
+        if ((grid < 0) | (grid > self.layout.size)).any():
+            raise Contradiction("Clue outside 1..size")
+        for cell in np.flatnonzero(grid):
+            self.assign(int(cell), int(grid[cell]))
+
+    @property
+    def solved(self):
+        return all(self.values)
+
+    def eliminate(self, cell, mask):
+        # Removes the values of mask from the candidates of cell, returns True if something was removed
+        old = self.candidates[cell]
+        if not old & mask:
+            return False
+        new = old & ~mask
+        if not new:
+            raise Contradiction(f"No candidate left for cell {cell}")
+        self.candidates[cell] = new
+        self.dirty_units.update(self.layout.cell_units[cell])
+        if not new & (new - 1) and not self.values[cell]:
+            self.pending.append(cell)
+        return True
+
+    def assign(self, cell, value):
+        bit = 1 << (value - 1)
+        if not self.candidates[cell] & bit:
+            raise Contradiction(f"Value {value} is not a candidate of cell {cell}")
+        self.values[cell] = value
+        self.candidates[cell] = bit
+        self.dirty_units.update(self.layout.cell_units[cell])
+        for peer in self.layout.peers[cell]:
+            self.eliminate(peer, bit)
+
+    def naked_singles(self):
+        # A cell with a single candidate gets that value
+        changed = False
+        while self.pending:
+            cell = self.pending.pop()
+            if self.values[cell]:
+                continue
+            self.assign(cell, self.candidates[cell].bit_length())
+            self.counts["naked_single"] += 1
+            changed = True
+        return changed
+
+    def hidden_singles(self):
+        # A value with a single possible cell in a region goes there (only changed regions are checked)
+        changed = False
+        candidates, values, units = self.candidates, self.values, self.layout.units
+        while self.dirty_units:
+            cells = units[self.dirty_units.pop()]
+            once = twice = 0
+            for cell in cells:
+                mask = candidates[cell]
+                twice |= once & mask
+                once |= mask
+            if once != self.layout.all_values:
+                raise Contradiction("A value has no place left in a region")
+            unique = once & ~twice
+            while unique:
+                bit = unique & -unique
+                unique ^= bit
+                for cell in cells:
+                    if candidates[cell] & bit:
+                        if not values[cell]:
+                            self.assign(cell, bit.bit_length())
+                            self.counts["hidden_single"] += 1
+                            changed = True
+                        break
+        return changed
+
+    def locked_candidates(self):
+        # If inside a region a value only fits in the cells shared with a second region,
+        # it is removed from the rest of the second region (pointing and claiming)
+        changed = False
+        candidates = self.candidates
+        for shared, first_rest, second_rest in self.layout.intersections:
+            shared_mask = rest_mask = 0
+            for cell in shared:
+                shared_mask |= candidates[cell]
+            for cell in first_rest:
+                rest_mask |= candidates[cell]
+            locked = shared_mask & ~rest_mask
+            if not locked:
+                continue
+            for cell in second_rest:
+                if self.eliminate(cell, locked):
+                    self.counts["locked_candidates"] += 1
+                    changed = True
+        return changed
+
+    def naked_pairs(self):
+        # Two cells of a region with the same two candidates remove them from the rest of the region
+        changed = False
+        candidates, values = self.candidates, self.values
+        for cells in self.layout.units:
+            seen = {}
+            for cell in cells:
+                mask = candidates[cell]
+                if values[cell] or mask.bit_count() != 2:
+                    continue
+                if mask not in seen:
+                    seen[mask] = cell
+                    continue
+                pair = (seen[mask], cell)
+                for other in cells:
+                    if other not in pair and self.eliminate(other, mask):
+                        self.counts["naked_pair"] += 1
+                        changed = True
+        return changed
+
+    def hidden_pairs(self):
+        # Two values that only fit in the same two cells of a region remove every other candidate of those cells
+        changed = False
+        candidates, values = self.candidates, self.values
+        for cells in self.layout.units:
+            positions = {}
+            for value in range(self.layout.size):
+                bit = 1 << value
+                places = tuple(cell for cell in cells if candidates[cell] & bit and not values[cell])
+                if len(places) == 2:
+                    positions.setdefault(places, []).append(bit)
+            for places, bits in positions.items():
+                if len(bits) != 2:
+                    continue
+                mask = bits[0] | bits[1]
+                for cell in places:
+                    if self.eliminate(cell, candidates[cell] & ~mask):
+                        self.counts["hidden_pair"] += 1
+                        changed = True
+        return changed
+
+    def x_wing(self):
+        # A value that fits in exactly the same two columns of two rows is removed from the rest of
+        # those columns (and the same with rows and columns swapped)
+        changed = False
+        candidates, values = self.candidates, self.values
+        for lines, crosses in ((self.layout.rows, self.layout.cols), (self.layout.cols, self.layout.rows)):
+            for value in range(self.layout.size):
+                bit = 1 << value
+                pairs = {}
+                for line_index, line in enumerate(lines):
+                    places = tuple(position for position, cell in enumerate(line) if candidates[cell] & bit and not values[cell])
+                    if len(places) == 2:
+                        pairs.setdefault(places, []).append(line_index)
+                for places, line_indices in pairs.items():
+                    if len(line_indices) != 2:
+                        continue
+                    for position in places:
+                        for line_index, cell in enumerate(crosses[position]):
+                            if line_index not in line_indices and self.eliminate(cell, bit):
+                                self.counts["x_wing"] += 1
+                                changed = True
+        return changed
+
+    def naked_triples(self):
+        # Three cells of a region whose candidates hold only three values remove them from the rest of the region
+        changed = False
+        candidates, values = self.candidates, self.values
+        for cells in self.layout.units:
+            open_cells = [cell for cell in cells if not values[cell] and candidates[cell].bit_count() <= 3]
+            for triple in combinations(open_cells, 3):
+                mask = candidates[triple[0]] | candidates[triple[1]] | candidates[triple[2]]
+                if mask.bit_count() != 3:
+                    continue
+                for other in cells:
+                    if other not in triple and self.eliminate(other, mask):
+                        self.counts["naked_triple"] += 1
+                        changed = True
+        return changed
+
+    def hidden_triples(self):
+        # Three values that only fit in the same three cells of a region remove every other candidate of those cells
+        changed = False
+        candidates, values = self.candidates, self.values
+        for cells in self.layout.units:
+            # value bit -> mask of the positions (in the region) where the value fits
+            places = {}
+            for value in range(self.layout.size):
+                bit = 1 << value
+                positions = 0
+                for position, cell in enumerate(cells):
+                    if candidates[cell] & bit and not values[cell]:
+                        positions |= 1 << position
+                if 2 <= positions.bit_count() <= 3:
+                    places[bit] = positions
+            for triple in combinations(places, 3):
+                positions = places[triple[0]] | places[triple[1]] | places[triple[2]]
+                if positions.bit_count() != 3:
+                    continue
+                mask = triple[0] | triple[1] | triple[2]
+                for position, cell in enumerate(cells):
+                    if positions >> position & 1 and self.eliminate(cell, candidates[cell] & ~mask):
+                        self.counts["hidden_triple"] += 1
+                        changed = True
+        return changed
+
+    def swordfish(self):
+        # A value that fits in only three columns of three rows (two or three cells per row) is removed
+        # from the rest of those columns (and the same with rows and columns swapped)
+        changed = False
+        candidates, values = self.candidates, self.values
+        for lines, crosses in ((self.layout.rows, self.layout.cols), (self.layout.cols, self.layout.rows)):
+            for value in range(self.layout.size):
+                bit = 1 << value
+                line_places = []
+                for line_index, line in enumerate(lines):
+                    positions = 0
+                    for position, cell in enumerate(line):
+                        if candidates[cell] & bit and not values[cell]:
+                            positions |= 1 << position
+                    if 2 <= positions.bit_count() <= 3:
+                        line_places.append((line_index, positions))
+                for fish in combinations(line_places, 3):
+                    positions = fish[0][1] | fish[1][1] | fish[2][1]
+                    if positions.bit_count() != 3:
+                        continue
+                    line_indices = (fish[0][0], fish[1][0], fish[2][0])
+                    for position in range(self.layout.size):
+                        if not positions >> position & 1:
+                            continue
+                        for line_index, cell in enumerate(crosses[position]):
+                            if line_index not in line_indices and self.eliminate(cell, bit):
+                                self.counts["swordfish"] += 1
+                                changed = True
+        return changed
+
+    def chains(self):
+        """
+        Single value chains (simple colouring): the two cells of a value in a region where it only fits
+        twice hold the value for exactly one of them, so the chains of such pairs are coloured
+        alternately and one colour holds the value. A colour with two cells in a region is false
+        (the value is removed from its cells), and a cell seeing both colours cannot hold the value.
+        """
+        changed = False
+        candidates, values, peer_sets = self.candidates, self.values, self.layout.peer_sets
+        for value in range(self.layout.size):
+            bit = 1 << value
+            links = {}
+            for cells in self.layout.units:
+                places = [cell for cell in cells if candidates[cell] & bit and not values[cell]]
+                if len(places) == 2:
+                    links.setdefault(places[0], []).append(places[1])
+                    links.setdefault(places[1], []).append(places[0])
+            coloured = set()
+            for start in links:
+                if start in coloured or not candidates[start] & bit:
+                    continue
+                colour = {start: 0}
+                queue = [start]
+                for cell in queue:
+                    for other in links[cell]:
+                        if other not in colour:
+                            colour[other] = 1 - colour[cell]
+                            queue.append(other)
+                        elif colour[other] == colour[cell]:
+                            raise Contradiction("Odd cycle of conjugate pairs")
+                coloured.update(colour)
+                groups = ([cell for cell in queue if colour[cell] == 0], [cell for cell in queue if colour[cell] == 1])
+
+                # Colour wrap: two cells of a colour in a region
+                wrapped = False
+                for group in groups:
+                    if any(second in peer_sets[first] for first, second in combinations(group, 2)):
+                        for cell in group:
+                            if self.eliminate(cell, bit):
+                                self.counts["chain"] += 1
+                        changed = wrapped = True
+                        break
+                if wrapped:
+                    continue
+
+                # Colour trap: a cell seeing both colours
+                if len(queue) < 2:
+                    continue
+                for cell in range(self.layout.cells):
+                    if cell in colour or values[cell] or not candidates[cell] & bit:
+                        continue
+                    peers = peer_sets[cell]
+                    if any(other in peers for other in groups[0]) and any(other in peers for other in groups[1]):
+                        self.eliminate(cell, bit)
+                        self.counts["chain"] += 1
+                        changed = True
+        return changed
+
+    def propagate(self):
+        """
+        Applies the techniques until a fixpoint: singles first, and after every change of a
+        harder technique (locked candidates, naked/hidden pairs, X-Wing) back to the singles.
+        :return: True if the grid is solved
+        :raises Contradiction: if the puzzle has no solution
+        """
+        advanced = (self.locked_candidates, self.naked_pairs, self.hidden_pairs, self.x_wing)
+        while True:
+            if self.naked_singles() or self.hidden_singles():
+                continue
+            if self.solved:
+                return True
+            if any(technique() for technique in advanced):
+                continue
+            return self.solved
+
+    def candidate_array(self):
+        # candidates[cell, value-1] is True if value is still possible at cell
+        return (np.array(self.candidates, dtype=np.int64)[:, None] >> np.arange(self.layout.size) & 1).astype(bool)
+
+
+def propagate(puzzle, variant="normal"):
+    """
+    Propagation pre-stage for the search and ILP engines, with the same result as
+    clue_propagation.propagate_clues but after propagation to a fixpoint.
+    :param puzzle: size x size grid of integers (0 represents an empty cell)
+    :param variant: name of a registered variant or a Variant
+    :return: (grid, candidates, feasible) where grid is the flat grid with every value placed by the
+             propagation, candidates[cell, value-1] is True if value is still possible at cell and
+             feasible is False if the puzzle has no solution
+    """
+    variant = get_variant(variant)
+    try:
+        candidate_grid = CandidateGrid(puzzle, variant)
+        candidate_grid.propagate()
+    except Contradiction:
+        return np.asarray(puzzle, dtype=int).reshape(variant.cells), np.zeros((variant.cells, variant.size), dtype=bool), False
+    return np.array(candidate_grid.values), candidate_grid.candidate_array(), True
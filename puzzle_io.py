@@ -0,0 +1,143 @@
+import bz2
+import gzip
+import io
+import mmap
+import sys
+
+import numpy as np
+
+# Byte -> cell value: digits are themselves, '.', '0', '-', '_' and '*' are empty cells, anything else is invalid
+_CELL_VALUES = np.full(256, 255, dtype=np.uint8)
+_CELL_VALUES[np.frombuffer(b"123456789", dtype=np.uint8)] = np.arange(1, 10)
+_CELL_VALUES[np.frombuffer(b"0.-_*", dtype=np.uint8)] = 0
+
+# Column names of the puzzle and the solution in the common CSV dumps
+PUZZLE_COLUMNS = ("puzzle", "puzzles", "quizzes", "quiz", "question")
+SOLUTION_COLUMNS = ("solution", "solutions", "answer")
+
+
+def parse_puzzle(line):
+    """
+    Parses one puzzle in the compact format: 81 characters, row by row, '0' or '.' for an empty cell.
+    :param line: str or bytes
+    :return: 9x9 numpy uint8 grid
+    """
+    if isinstance(line, str):
+        line = line.encode("ascii", "replace")
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError(f"Expected 81 characters, got {len(line)}: {line!r}")
+    grid = _CELL_VALUES[np.frombuffer(line, dtype=np.uint8)]
+    if (grid == 255).any():
+        raise ValueError(f"Invalid character in puzzle: {line!r}")
+    return grid.reshape(9, 9)
+
+
+def format_grid(grid):
+    # Compact format of a grid: 81 digits, '0' for an empty cell
+    return (np.asarray(grid, dtype=np.uint8).reshape(81) + ord("0")).tobytes().decode("ascii")
+
+
+def open_puzzle_file(path, mode="rb"):
+    """
+    Opens a puzzle file, transparently (de)compressing gzip and bz2 files.
+    Compression is detected from the magic bytes when reading and from the suffix when writing.
+    '-' stands for stdin/stdout.
+    """
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        return stream.buffer if "b" in mode else stream
+    if "r" in mode:
+        with open(path, "rb") as raw:
+            magic = raw.read(3)
+        if magic[:2] == b"\x1f\x8b":
+            return gzip.open(path, mode)
+        if magic == b"BZh":
+            return bz2.open(path, mode)
+        return open(path, mode)
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode)
+    if str(path).endswith(".bz2"):
+        return bz2.open(path, mode)
+    return open(path, mode)
+
+
+def iter_lines(path, use_mmap=False):
+    """
+    Yields the lines of a puzzle file as bytes without loading the whole file.
+    :param use_mmap: memory-map plain (uncompressed) files instead of reading them through a buffer
+    """
+    stream = open_puzzle_file(path, "rb")
+    try:
+        if use_mmap and isinstance(stream, io.BufferedReader) and stream is not sys.stdin.buffer:
+            try:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return
+            with mapped:
+                yield from iter(mapped.readline, b"")
+        else:
+            yield from stream
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def read_puzzles(path, with_solutions=False, use_mmap=False):
+    """
+    Lazily reads puzzles from a file of 81 character lines or from a CSV dump
+    (a puzzle column and optionally a solution column, with or without a header).
+    Blank lines and lines starting with '#' are skipped; anything after the first
+    whitespace of a line (e.g. a rating) is ignored.
+    :param path: puzzle file (plain, .gz or .bz2), '-' for stdin
+    :param with_solutions: yield (puzzle, solution) tuples, solution is None when the file has none
+    :param use_mmap: memory-map plain files
+    :return: generator of 9x9 numpy uint8 grids
+    """
+    puzzle_column, solution_column = 0, 1
+    first = True
+    for line in iter_lines(path, use_mmap):
+        line = line.strip()
+        if not line or line.startswith(b"#"):
+            continue
+        fields = line.split(b",") if b"," in line else line.split(None, 1)[:1]
+
+        if first:
+            first = False
+            names = [field.strip().strip(b'"').decode("ascii", "replace").lower() for field in fields]
+            if any(name in PUZZLE_COLUMNS for name in names):
+                # Header of a CSV dump
+                puzzle_column = next(index for index, name in enumerate(names) if name in PUZZLE_COLUMNS)
+                solution_column = next((index for index, name in enumerate(names) if name in SOLUTION_COLUMNS), None)
+                continue
+
+        puzzle = parse_puzzle(fields[puzzle_column].strip(b'" '))
+        if not with_solutions:
+            yield puzzle
+            continue
+        solution = None
+        if solution_column is not None and solution_column < len(fields) and fields[solution_column].strip():
+            solution = parse_puzzle(fields[solution_column].strip(b'" '))
+        yield puzzle, solution
+
+
+def write_solutions(path, grids):
+    """
+    Writes grids in the compact 81 character format, one per line, as they arrive.
+    :param path: output file (compressed if it ends with .gz or .bz2), '-' for stdout
+    :param grids: iterable of 9x9 grids
+    :return: number of grids written
+    """
+    stream = open_puzzle_file(path, "wb")
+    count = 0
+    try:
+        for grid in grids:
+            stream.write((np.asarray(grid, dtype=np.uint8).reshape(81) + ord("0")).tobytes() + b"\n")
+            count += 1
+    finally:
+        if stream is sys.stdout.buffer:
+            stream.flush()
+        else:
+            stream.close()
+    return count
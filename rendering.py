@@ -0,0 +1,188 @@
+import multiprocessing
+
+import numpy as np
+from matplotlib.patches import Rectangle
+
+from variants import INSIDE_SQUARE_REGIONS, PYRAMID_REGIONS, get_variant
+
+# Colour of the cells at every position inside the 3x3 grids (position sudoku), indexed by [row % 3][col % 3]
+POSITION_COLOURS = [["r", "m", "olive"],
+                    ["y", "black", "aquamarine"],
+                    ["cyan", "0.8", "pink"]]
+
+
+def draw_board(ax, grid, box_linewidth=3, grid_lines=True):
+    # Background, cell grid and the boundaries of the 3x3 squares, returns the background image
+    image = ax.imshow(grid, cmap='binary', vmin=0, vmax=9)
+    ax.set_xticks(np.arange(-.5, 9, 1))
+    ax.set_yticks(np.arange(-.5, 9, 1))
+    if grid_lines:
+        ax.grid(color='black', linestyle='-', linewidth=2)
+    ax.tick_params(axis='both', length=0)
+
+    for i in range(0, 10, 3):
+        ax.axhline(i-0.5, color='purple', linewidth=box_linewidth)
+        ax.axvline(i-0.5, color='purple', linewidth=box_linewidth)
+    return image
+
+
+def draw_diagonals(ax):
+    # add the diagonal lines (sudoku X)
+    ax.plot([-0.5, 8.5], [-0.5, 8.5], color='green', linestyle='--', linewidth=3)
+    ax.plot([-0.5, 8.5], [8.5, -0.5], color='green', linestyle='--', linewidth=3)
+
+
+def draw_inside_squares(ax):
+    # add the boundaries of the 3x3 inside squares (four square sudoku)
+    for region in INSIDE_SQUARE_REGIONS:
+        for (i, j) in region:
+            ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='yellow', linewidth=3))
+
+
+def draw_pyramids(ax):
+    # add the boundaries of the pyramids (four pyramids sudoku)
+    for region in PYRAMID_REGIONS:
+        for (i, j) in region:
+            ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='yellow', linewidth=4))
+
+
+def draw_position_colours(ax):
+    # Coloring every 3 blocks horizontally and vertically to make the constraint visible (position sudoku)
+    for i in range(9):
+        for j in range(9):
+            ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=True, color=POSITION_COLOURS[i % 3][j % 3]))
+
+
+# Drawing options of every variant: overlay function, colour of the solved digits, ...
+VARIANT_STYLES = {
+    "normal": dict(overlay=None, solved_colour='red', empty_linewidth=2),
+    "x": dict(overlay=draw_diagonals, solved_colour='red', empty_linewidth=1),
+    "four_square": dict(overlay=draw_inside_squares, solved_colour='red', empty_linewidth=1),
+    "four_pyramids": dict(overlay=draw_pyramids, solved_colour='red', empty_linewidth=1, box_linewidth=2),
+    "position": dict(overlay=draw_position_colours, solved_colour='green', empty_linewidth=1, grid_lines=False, outline_given=True),
+}
+
+
+def draw_solution(ax, puzzle, solution, variant="normal"):
+    """
+    Draws a solved grid on ax: the given digits in blue, the solved ones in the variant colour
+    and the overlay of the variant (diagonals, inside squares, pyramids, position colours).
+    """
+    style = VARIANT_STYLES[variant]
+    draw_board(ax, solution, style.get("box_linewidth", 3), style.get("grid_lines", True))
+    for i in range(9):
+        for j in range(9):
+            if puzzle[i][j] != 0:
+                ax.text(j, i, int(puzzle[i][j]), color='blue', fontsize=16, ha='center', va='center')
+                if style.get("outline_given"):
+                    ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, linewidth=1))
+            else:
+                ax.text(j, i, int(solution[i][j]), color=style["solved_colour"], fontsize=16, ha='center', va='center')
+                ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='black', linewidth=style["empty_linewidth"]))
+    if style["overlay"] is not None:
+        style["overlay"](ax)
+    ax.axis('off')
+
+
+def plot_solution(puzzle, solution, variant="normal"):
+    # Plot the solved Sudoku grid
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6,6))
+    draw_solution(ax, puzzle, solution, variant)
+    plt.show()
+
+
+def plot_sudoku(grid, outline_empty=False):
+    # Plot a (partially) filled grid: digits in blue, empty cells optionally outlined
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6,6))
+    draw_board(ax, grid)
+    for i in range(9):
+        for j in range(9):
+            if grid[i][j] != 0:
+                ax.text(j, i, grid[i][j], color='blue', fontsize=16, ha='center', va='center')
+            elif outline_empty:
+                ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='black', linewidth=2))
+    plt.axis('off')
+    plt.show()
+
+
+class BatchRenderer:
+    """
+    Off-screen renderer of solved grids to image files (PNG, SVG, ... from the file suffix).
+    One Agg figure is built per renderer with the board, the variant overlay, 81 text
+    artists and 81 cell outlines; every grid only updates the image data, the strings,
+    colours and outline visibility before saving, instead of building a new figure.
+    :param variant: name of a registered variant or a Variant
+    """
+    def __init__(self, variant="normal", figsize=(6,6), dpi=100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.style = VARIANT_STYLES[get_variant(variant).name]
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+
+        self.image = draw_board(ax, np.zeros((9, 9)), self.style.get("box_linewidth", 3), self.style.get("grid_lines", True))
+        self.texts = [[ax.text(j, i, '', fontsize=16, ha='center', va='center') for j in range(9)] for i in range(9)]
+        self.outlines = [[ax.add_patch(Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='black', visible=False))
+                          for j in range(9)] for i in range(9)]
+        if self.style["overlay"] is not None:
+            self.style["overlay"](ax)
+        ax.axis('off')
+
+    def render(self, puzzle, solution, path):
+        """
+        :param puzzle: 9x9 grid of the given digits (0 represents an empty cell)
+        :param solution: solved 9x9 grid
+        :param path: image file, its suffix selects the format
+        """
+        self.image.set_data(np.asarray(solution))
+        outline_given = self.style.get("outline_given", False)
+        for i in range(9):
+            for j in range(9):
+                given = puzzle[i][j] != 0
+                text = self.texts[i][j]
+                text.set_text(str(int(puzzle[i][j] if given else solution[i][j])))
+                text.set_color('blue' if given else self.style["solved_colour"])
+                outline = self.outlines[i][j]
+                outline.set_visible(outline_given or not given)
+                outline.set_linewidth(1 if given else self.style["empty_linewidth"])
+        self.figure.savefig(path)
+
+
+# Renderer of the worker process, built once by _init_render_worker
+_worker_renderer = None
+
+def _init_render_worker(variant, figsize, dpi):
+    global _worker_renderer
+    _worker_renderer = BatchRenderer(variant, figsize, dpi)
+
+
+def _render_indexed(item):
+    path, (puzzle, solution) = item
+    _worker_renderer.render(puzzle, solution, path)
+    return path
+
+
+def render_many(items, path_pattern, variant="normal", workers=0, figsize=(6,6), dpi=100, chunksize=16):
+    """
+    Renders a batch of solved grids to image files.
+    :param items: iterable of (puzzle, solution) pairs
+    :param path_pattern: output path with an {index} field, e.g. "out/{index:06d}.png" (the suffix selects the format)
+    :param workers: 0 renders in this process with one reused figure, otherwise the number of worker
+                    processes (None for the number of cores), each with its own reused figure
+    :return: number of rendered images
+    """
+    jobs = ((path_pattern.format(index=index), item) for index, item in enumerate(items))
+    if workers == 0:
+        renderer = BatchRenderer(variant, figsize, dpi)
+        count = 0
+        for path, (puzzle, solution) in jobs:
+            renderer.render(puzzle, solution, path)
+            count += 1
+        return count
+
+    with multiprocessing.Pool(workers, initializer=_init_render_worker, initargs=(variant, figsize, dpi)) as pool:
+        return sum(1 for _ in pool.imap_unordered(_render_indexed, jobs, chunksize))
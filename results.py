@@ -0,0 +1,67 @@
+from time import perf_counter
+
+import numpy as np
+
+# Status of a solve
+SOLVED = "SOLVED"
+INFEASIBLE = "INFEASIBLE"
+NOT_SOLVED = "NOT_SOLVED"  # the solver stopped without a solution nor a proof of infeasibility
+TIMEOUT = "TIMEOUT"        # the time or node budget of the solve ran out (or it was cancelled), see budget.py
+
+
+class SolveResult:
+    """
+    Result of a solve, the same for every engine.
+    :param status: SOLVED, INFEASIBLE, NOT_SOLVED or TIMEOUT
+    :param grid: solved size x size grid as a uint8 array, None unless the status is SOLVED
+    :param timings: phase -> seconds, always with the "total" time of the solve (the phases are
+                    only recorded when the solve is profiled, see profiling.py)
+    :param stats: solver statistics: raw status of the solver, model size and search counters of a profiled solve
+    :param engine: name of the engine
+    """
+    __slots__ = ("status", "grid", "timings", "stats", "engine")
+
+    def __init__(self, status, grid=None, timings=None, stats=None, engine=None):
+        self.status = status
+        self.grid = grid
+        self.timings = {} if timings is None else timings
+        self.stats = {} if stats is None else stats
+        self.engine = engine
+
+    @property
+    def solved(self):
+        return self.status == SOLVED
+
+    def __bool__(self):
+        # A result is true if the puzzle is solved, like the bool of the former solve functions
+        return self.status == SOLVED
+
+    def as_dict(self):
+        # JSON friendly form
+        return dict(status=self.status, grid=None if self.grid is None else self.grid.tolist(),
+                    timings=dict(self.timings), stats=dict(self.stats), engine=self.engine)
+
+    def __repr__(self):
+        return f"SolveResult(status={self.status!r}, engine={self.engine!r}, timings={self.timings!r}, stats={self.stats!r})"
+
+
+def make_result(engine, status, grid, size, profile, start, **stats):
+    """
+    Builds the result of a solve from the engine output and its profile.
+    :param engine: name of the engine
+    :param grid: solution grid in any shape (ignored unless status is SOLVED)
+    :param size: number of rows of the board
+    :param profile: SolveProfile (or profiling.NULL_PROFILE) of the solve, its phases and counters go to the result
+    :param start: perf_counter() at the start of the solve
+    :param stats: extra statistics of the engine (e.g. the raw solver status)
+    """
+    timings = {}
+    if profile.enabled:
+        timings.update(profile.phases)
+        stats = {**profile.model, **profile.counters, **stats}
+    timings["total"] = perf_counter() - start
+    if status == SOLVED:
+        grid = np.asarray(grid, dtype=np.uint8).reshape(size, size)
+    else:
+        grid = None
+    return SolveResult(status, grid, timings, stats, engine)
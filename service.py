@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import ENGINES
+from budget import Budget, CancelHandle
+from milp_backends import BACKENDS
+from puzzle_io import format_grid, parse_puzzle
+from variants import get_variant
+
+logger = logging.getLogger(__name__)
+
+
+class _CancelFlag:
+    # Event-like view of one byte of a shared array, the cancel event of a solve (see budget.CancelHandle)
+    __slots__ = ("flags", "index")
+
+    def __init__(self, flags, index):
+        self.flags = flags
+        self.index = index
+
+    def set(self):
+        self.flags[self.index] = 1
+
+    def clear(self):
+        self.flags[self.index] = 0
+
+    def is_set(self):
+        return bool(self.flags[self.index])
+
+
+# Warm solve functions of a worker process by (engine, variant, backend), built on first use
+_worker_engines = {}
+_worker_cancel_flags = None
+
+def _init_worker(cancel_flags):
+    global _worker_cancel_flags
+    _worker_cancel_flags = cancel_flags
+
+
+def _solve_in_worker(engine, variant, backend, puzzle, time_limit, node_limit, flag):
+    key = (engine, variant, backend)
+    if key not in _worker_engines:
+        _worker_engines[key] = ENGINES[engine](variant, backend)
+    cancel = CancelHandle(_CancelFlag(_worker_cancel_flags, flag))
+    return _worker_engines[key](puzzle, Budget(time_limit, node_limit, cancel))
+
+
+class _Solve:
+    # Solve in progress: its task and the number of callers waiting for it
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SolveService:
+    """
+    Asyncio front end of the engines: the solves run on a pool of worker processes, so the event
+    loop never blocks on a solver. At most max_pending puzzles are queued on the pool (callers
+    wait for a slot), and concurrent requests for the same puzzle share one solve. A solve without
+    waiters left (all its callers cancelled) is cancelled: dropped if still queued, stopped at its
+    next budget check if running.
+    :param engine: solver engine name (one of batch.ENGINES)
+    :param workers: number of worker processes (defaults to the number of cores)
+    :param max_pending: puzzles submitted to the pool at a time (2 per worker if None)
+    :param backend: MILP backend name of the ILP engine (see milp_backends.BACKENDS)
+    :param time_limit: seconds per puzzle (see budget.Budget), None for no limit
+    """
+    def __init__(self, engine="dlx", workers=None, max_pending=None, backend=None, time_limit=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+        self.engine = engine
+        self.backend = backend
+        self.time_limit = time_limit
+        self.workers = os.cpu_count() if workers is None else workers
+        max_pending = 2 * self.workers if max_pending is None else max_pending
+        context = multiprocessing.get_context("spawn")
+        # One cancel flag per pending solve, shared with the workers
+        self.cancel_flags = context.RawArray("b", max_pending)
+        self.free_flags = list(range(max_pending))
+        # Spawned workers: forked ones would inherit the client sockets of serve() and keep them open
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                            initializer=_init_worker, initargs=(self.cancel_flags,))
+        self.slots = asyncio.Semaphore(max_pending)
+        # (variant, puzzle bytes, time limit, node limit) -> _Solve in progress
+        self.in_flight = {}
+        self.coalesced = 0
+
+    async def solve(self, puzzle, variant="normal", time_limit=None, node_limit=None):
+        """
+        :param puzzle: size x size grid of integers (0 represents an empty cell)
+        :param variant: name of a registered variant
+        :param time_limit: seconds for this puzzle (the time_limit of the service if None)
+        :param node_limit: search nodes for this puzzle (see budget.Budget), None for no limit
+        :return: results.SolveResult (shared by the requests coalesced on the same puzzle and budget)
+        """
+        variant = get_variant(variant)
+        grid = np.asarray(puzzle, dtype=np.uint8).reshape(variant.size, variant.size)
+        time_limit = self.time_limit if time_limit is None else time_limit
+        key = (variant.name, grid.tobytes(), time_limit, node_limit)
+        in_flight = self.in_flight.get(key)
+        if in_flight is None:
+            in_flight = _Solve(asyncio.ensure_future(self._run(variant.name, grid, time_limit, node_limit)))
+            self.in_flight[key] = in_flight
+            in_flight.task.add_done_callback(lambda _: self._forget(key, in_flight))
+        else:
+            self.coalesced += 1
+        in_flight.waiters += 1
+        try:
+            # A cancelled caller does not cancel the solve shared with the others
+            return await asyncio.shield(in_flight.task)
+        finally:
+            in_flight.waiters -= 1
+            if not in_flight.waiters and not in_flight.task.done():
+                # The last caller is gone
+                self._forget(key, in_flight)
+                in_flight.task.cancel()
+
+    def _forget(self, key, in_flight):
+        # A later solve of the same key may already be in flight
+        if self.in_flight.get(key) is in_flight:
+            del self.in_flight[key]
+
+    async def _run(self, variant, grid, time_limit, node_limit):
+        await self.slots.acquire()
+        flag = self.free_flags.pop()
+        cancel = _CancelFlag(self.cancel_flags, flag)
+        cancel.clear()
+        future = self.executor.submit(_solve_in_worker, self.engine, variant, self.backend, grid,
+                                      time_limit, node_limit, flag)
+        result = asyncio.wrap_future(future)
+
+        def release(_):
+            # The slot and the flag are free once the worker is done with the solve
+            if not result.cancelled():
+                result.exception()
+            self.free_flags.append(flag)
+            self.slots.release()
+
+        result.add_done_callback(release)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            # Dropped if still queued, else the worker stops at its next budget check
+            if not future.cancel():
+                cancel.set()
+            raise
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+# Default service of every engine for solve_async, started on first use
+_services = {}
+
+async def solve_async(puzzle, variant="normal", engine="dlx", time_limit=None, node_limit=None):
+    """
+    Solves a puzzle without blocking the event loop, on the default SolveService of the engine.
+    Cancelling the call cancels the solve (unless other calls wait for the same puzzle).
+    :param time_limit: seconds for this puzzle, None for no limit
+    :param node_limit: search nodes for this puzzle, None for no limit
+    :return: results.SolveResult
+    """
+    if engine not in _services:
+        _services[engine] = SolveService(engine)
+    return await _services[engine].solve(puzzle, variant, time_limit, node_limit)
+
+
+def _parse_puzzle(request, variant):
+    # "puzzle": "81 characters" or grid as nested lists of integers in 0..size
+    puzzle = request["puzzle"]
+    if isinstance(puzzle, str):
+        puzzle = parse_puzzle(puzzle)
+    puzzle = np.array(puzzle, dtype=np.int64)
+    if puzzle.shape != (variant.size, variant.size):
+        raise ValueError(f"Expected a {variant.size}x{variant.size} grid, got shape {puzzle.shape}")
+    if ((puzzle < 0) | (puzzle > variant.size)).any():
+        raise ValueError(f"Values of the grid must be in 0..{variant.size}")
+    return puzzle.astype(np.uint8)
+
+
+def _response(request_id, result):
+    solution = None
+    if result.grid is not None:
+        solution = format_grid(result.grid) if result.grid.size == 81 else result.grid.tolist()
+    return dict(id=request_id, status=result.status, solution=solution, engine=result.engine,
+                timings=result.timings, stats=result.stats)
+
+
+async def serve(service, host="127.0.0.1", port=8765, max_requests=1024):
+    """
+    Serves newline-delimited JSON over TCP: every request line
+    {"id": ..., "puzzle": "81 characters" or nested lists, "variant": "normal", "time_limit": seconds,
+    "node_limit": nodes} (variant and limits optional) gets a response line
+    {"id": ..., "status": ..., "solution": "81 characters" or nested lists or null, "timings": ..., "stats": ...}
+    (or {"id": ..., "error": ...}) as soon as it is solved, possibly out of order.
+    At most max_requests requests are in progress over all the connections, the server stops
+    reading the connections while it is full.
+    """
+    requests = asyncio.Semaphore(max_requests)
+
+    async def answer(line, writer):
+        try:
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                variant = get_variant(request.get("variant", "normal"))
+                result = await service.solve(_parse_puzzle(request, variant), variant.name,
+                                             request.get("time_limit"), request.get("node_limit"))
+                response = _response(request_id, result)
+            except Exception as error:
+                # Invalid request (or a failed worker): the connection goes on with the next requests
+                response = dict(id=request_id, error=str(error))
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            requests.release()
+
+    async def handle(reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                await requests.acquire()
+                task = asyncio.create_task(answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Serving on %s", ", ".join(str(socket.getsockname()) for socket in server.sockets))
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the solvers over TCP with newline-delimited JSON requests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--engine", default="dlx", choices=sorted(ENGINES))
+    parser.add_argument("--backend", default=None, choices=sorted(BACKENDS), help="MILP backend of the ilp engine")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--max-pending", type=int, default=None, help="puzzles queued on the workers at a time")
+    parser.add_argument("--max-requests", type=int, default=1024, help="requests in progress over all the connections")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per puzzle")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        async with SolveService(args.engine, args.workers, args.max_pending, args.backend, args.time_limit) as service:
+            await serve(service, args.host, args.port, args.max_requests)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import numpy as np
+
+import dlx
+import bitmask_backtracking
+from milp_matrix import MilpSudokuSolver
+from normal_sudoku import SudokuSolver
+from variants import sized_variant
+
+
+def make_puzzle(box_size, empty_fraction=0.4, seed=0):
+    """
+    Random puzzle of a box_size^2 x box_size^2 board: a pattern solution shuffled with
+    the sudoku symmetries (bands, rows inside a band, stacks, columns inside a stack, values)
+    and a fraction of its cells emptied. The solution is not necessarily unique.
+    :return: (puzzle, solution) as 2D numpy arrays
+    """
+    rng = np.random.default_rng(seed)
+    size = box_size * box_size
+    rows = np.concatenate([band * box_size + rng.permutation(box_size) for band in rng.permutation(box_size)])
+    cols = np.concatenate([stack * box_size + rng.permutation(box_size) for stack in rng.permutation(box_size)])
+    pattern = (box_size * (rows[:, None] % box_size) + rows[:, None] // box_size + cols[None, :]) % size
+    solution = rng.permutation(size)[pattern] + 1
+
+    puzzle = solution.copy()
+    puzzle.flat[rng.choice(size * size, int(empty_fraction * size * size), replace=False)] = 0
+    return puzzle, solution
+
+
+def is_solution(grid, puzzle, box_size):
+    # Every region of the plain variant holds every value once and the given cells are kept
+    variant = sized_variant(box_size)
+    grid = np.asarray(grid).reshape(variant.cells)
+    values = np.sort(grid[variant.region_cells], axis=1)
+    return bool((values == np.arange(1, variant.size + 1)).all() and
+                ((puzzle.reshape(variant.cells) == 0) | (puzzle.reshape(variant.cells) == grid)).all())
+
+
+def _ilp(box_size):
+    solver = SudokuSolver(msg=False, box_size=box_size)
+    return lambda puzzle: solver.solve(puzzle).grid
+
+def _milp(box_size):
+    solver = MilpSudokuSolver(box_size=box_size)
+    return lambda puzzle: solver.solve(puzzle).grid
+
+def _dlx(box_size):
+    matrix = dlx.get_matrix("normal", box_size)
+    return lambda puzzle: matrix.run(puzzle)[1]
+
+def _backtracking(box_size):
+    return lambda puzzle: bitmask_backtracking.solve(puzzle, box_size=box_size).grid
+
+
+# Engine name -> factory of a solve(puzzle) function for a box size, its time is the build time
+ENGINES = {"ilp": _ilp, "milp": _milp, "dlx": _dlx, "backtracking": _backtracking}
+
+
+def compare_sizes(box_sizes=(3, 4, 5, 6), engines=tuple(ENGINES), empty_fraction=0.4, seed=0):
+    """
+    Builds every engine for every board size and solves the same random puzzle with it.
+    :return: list of dicts with the board size, the ILP dimensions, build and solve times (seconds) of every engine
+    """
+    results = []
+    for box_size in box_sizes:
+        variant = sized_variant(box_size)
+        puzzle, _ = make_puzzle(box_size, empty_fraction, seed)
+        for engine in engines:
+            start = time.perf_counter()
+            solve = ENGINES[engine](box_size)
+            built = time.perf_counter()
+            solution = solve(puzzle)
+            solved = time.perf_counter()
+            results.append(dict(size=variant.size, engine=engine,
+                                variables=variant.cells * variant.size,
+                                constraints=variant.cells + len(variant.regions) * variant.size,
+                                build=built - start, solve=solved - built,
+                                solved=solution is not None and is_solution(solution, puzzle, box_size)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the engines on plain boards of different sizes")
+    parser.add_argument("--box-sizes", type=int, nargs="+", default=[3, 4, 5, 6], help="box sizes (3 for 9x9, 4 for 16x16, ...)")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--empty", type=float, default=0.4, help="fraction of empty cells of the random puzzles")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'board':>7} {'engine':>12} {'variables':>9} {'constraints':>11} {'build (s)':>9} {'solve (s)':>9}  solved")
+    for row in compare_sizes(args.box_sizes, args.engines, args.empty, args.seed):
+        board = f"{row['size']}x{row['size']}"
+        print(f"{board:>7} {row['engine']:>12} {row['variables']:>9} {row['constraints']:>11} "
+              f"{row['build']:>9.3f} {row['solve']:>9.3f}  {row['solved']}")
+
+
+if __name__ == "__main__":
+    main()
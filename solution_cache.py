@@ -0,0 +1,194 @@
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from itertools import permutations
+from time import perf_counter
+
+import numpy as np
+
+from results import INFEASIBLE, SOLVED, SolveResult
+from variants import get_variant
+
+
+def _board_transforms(box_size):
+    """
+    Cell permutations of the board generated by the rotations/reflections (dihedral group) and,
+    up to 9x9 boards, the permutations of the bands and the stacks (box_size! each, too many for
+    larger boards). A transform t maps a flat grid to grid[t].
+    :return: (transforms, cells) array of unique transforms, the identity first
+    """
+    size = box_size * box_size
+    index = np.arange(size * size).reshape(size, size)
+    dihedral = [index, index.T]
+    dihedral += [np.rot90(index, turns) for turns in (1, 2, 3)] + [np.rot90(index.T, turns) for turns in (1, 2, 3)]
+
+    offsets = np.arange(box_size)
+    orders = permutations(range(box_size)) if box_size <= 3 else [range(box_size)]
+    lines = [np.concatenate([band * box_size + offsets for band in order]) for order in orders]
+    transforms = {}
+    for grid in dihedral:
+        for rows in lines:
+            for cols in lines:
+                transform = grid[np.ix_(rows, cols)].ravel()
+                transforms.setdefault(transform.tobytes(), transform)
+    return np.array(list(transforms.values()))
+
+
+_symmetries = {}
+
+def get_symmetries(variant):
+    """
+    Transforms of _board_transforms that map the regions of the variant onto regions of the variant,
+    so that a transformed puzzle is a puzzle of the same variant (all of them for the plain board, fewer
+    for the variants with extra regions). Computed once per variant.
+    :return: (transforms, cells) array of cell permutations, the identity first
+    """
+    variant = get_variant(variant)
+    if variant.name not in _symmetries:
+        regions = {frozenset(cells) for cells in variant.region_cells.tolist()}
+        _symmetries[variant.name] = np.array([transform for transform in _board_transforms(variant.box_size)
+                                              if all(frozenset(transform[cells].tolist()) in regions
+                                                     for cells in variant.region_cells)])
+    return _symmetries[variant.name]
+
+
+def canonical_form(puzzle, variant="normal"):
+    """
+    Canonical form of a puzzle under the symmetries of its variant and the relabeling of the digits:
+    every symmetric grid has its digits renumbered in order of first appearance and the lexicographically
+    smallest one is kept. Equivalent puzzles (rotated, reflected, with bands or stacks swapped,
+    with the digits relabeled) get the same canonical form.
+    :param puzzle: size x size grid of integers (0 represents an empty cell)
+    :return: (key, canonical, transform, labels) with key the 16 byte digest of the variant and the canonical
+             grid, canonical the flat uint8 grid, and canonical == labels[puzzle.ravel()[transform]]
+    :raises ValueError: if a value of the puzzle is outside 0..size
+    """
+    variant = get_variant(variant)
+    transforms = get_symmetries(variant)
+    puzzle = np.asarray(puzzle).reshape(variant.cells)
+    if ((puzzle < 0) | (puzzle > variant.size)).any():
+        # Such a value would index the labels of another transform
+        raise ValueError(f"Values of the puzzle must be in 0..{variant.size}")
+    grids = puzzle.astype(np.uint8)[transforms]
+
+    # First position of every digit in every transformed grid (cells if absent), the digits get the labels
+    # 1..size in that order (absent digits last, by value) so that every label map is a permutation
+    present = grids[:, None, :] == np.arange(1, variant.size + 1, dtype=np.uint8)[:, None]
+    first = present.argmax(axis=2)
+    first = np.where(np.take_along_axis(present, first[:, :, None], axis=2)[:, :, 0], first, variant.cells)
+    order = np.argsort(first, axis=1, kind="stable")
+    labels = np.zeros((len(transforms), variant.size + 1), dtype=np.uint8)
+    np.put_along_axis(labels[:, 1:], order, np.arange(1, variant.size + 1, dtype=np.uint8)[None, :], axis=1)
+    relabeled = labels.ravel()[grids + (np.arange(len(transforms)) * (variant.size + 1))[:, None]]
+
+    # Lexicographically smallest grid, comparing the rows as byte strings (the trailing zero bytes
+    # that numpy strips from them are the smallest value, which keeps the order)
+    best = int(np.argmin(relabeled.view(f"S{variant.cells}").ravel()))
+    canonical = relabeled[best]
+    key = hashlib.blake2b(variant.name.encode() + b"\0" + canonical.tobytes(), digest_size=16).digest()
+    return key, canonical, transforms[best], labels[best]
+
+
+class SolutionCache:
+    """
+    Solutions of canonical puzzles by key: an in-memory LRU, optionally backed by an SQLite file
+    shared between processes and runs.
+    :param maxsize: number of entries kept in memory
+    :param path: SQLite database file, None for memory only
+    """
+    def __init__(self, maxsize=100_000, path=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (key BLOB PRIMARY KEY, status TEXT, solution BLOB)")
+            self.db.commit()
+
+    def get(self, key):
+        """
+        :return: (status, canonical solution as bytes or None) or None if the key is not cached
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.db is not None:
+            entry = self.db.execute("SELECT status, solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key, status, solution):
+        entry = (status, solution)
+        self._remember(key, entry)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)", (key, *entry))
+            self.db.commit()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class CachedSolver:
+    """
+    Caching layer in front of any engine: puzzles are looked up by canonical form, and only
+    the misses reach the engine. SOLVED and INFEASIBLE results are cached (not the TIMEOUT
+    ones), the solution is stored in the canonical frame and mapped back to every puzzle.
+    :param solve: solve(puzzle) function of an engine returning a results.SolveResult
+    :param variant: name of a registered variant or a Variant
+    :param cache: SolutionCache, a new in-memory one if None
+    """
+    def __init__(self, solve, variant="normal", cache=None):
+        self.engine_solve = solve
+        self.variant = get_variant(variant)
+        self.cache = SolutionCache() if cache is None else cache
+
+    def solve(self, puzzle):
+        """
+        :return: results.SolveResult, stats["cache"] is "hit", "miss" or "bypass" (clues outside 1..size,
+                 the engine reports the puzzle and nothing is cached)
+        """
+        start = perf_counter()
+        grid = np.asarray(puzzle)
+        if ((grid < 0) | (grid > self.variant.size)).any():
+            result = self.engine_solve(puzzle)
+            result.stats["cache"] = "bypass"
+            return result
+        key, _, transform, labels = canonical_form(grid, self.variant)
+        entry = self.cache.get(key)
+        if entry is None:
+            result = self.engine_solve(puzzle)
+            result.stats["cache"] = "miss"
+            if result.status == SOLVED:
+                # Solution in the canonical frame: the same transform and labels as the puzzle
+                self.cache.put(key, SOLVED, labels[result.grid.ravel()[transform]].tobytes())
+            elif result.status == INFEASIBLE:
+                self.cache.put(key, INFEASIBLE, None)
+            return result
+
+        status, canonical_solution = entry
+        grid = None
+        if status == SOLVED:
+            # Inverse of canonical = labels[grid[transform]]: grid[transform] = inverse_labels[canonical]
+            inverse_labels = np.zeros_like(labels)
+            inverse_labels[labels] = np.arange(len(labels), dtype=np.uint8)
+            grid = np.empty(self.variant.cells, dtype=np.uint8)
+            grid[transform] = inverse_labels[np.frombuffer(canonical_solution, dtype=np.uint8)]
+            grid = grid.reshape(self.variant.size, self.variant.size)
+        return SolveResult(status, grid, dict(total=perf_counter() - start), dict(cache="hit"), "cache")
@@ -0,0 +1,17 @@
+import numpy as np
+
+from backtracking import solve_sudoku
+from benchmark import is_solution
+from results import SOLVED
+from variants import sized_variant
+
+
+def test_box_size():
+    # 16x16 board: a pattern solution with half of the cells emptied
+    rows, cols = np.indices((16, 16))
+    solution = (rows * 4 + rows // 4 + cols) % 16 + 1
+    puzzle = np.where(np.random.default_rng(0).random((16, 16)) < 0.5, solution, 0)
+    board = puzzle.tolist()
+    result = solve_sudoku(board, box_size=4)
+    assert result.status == SOLVED and is_solution(result.grid, puzzle, sized_variant(4))
+    assert (result.grid == board).all()
@@ -0,0 +1,19 @@
+from collections import Counter
+
+import dlx
+from benchmark import LEVELS, is_solution
+from solution_cache import canonical_form
+
+
+def test_corpus_puzzles_have_unique_solutions(corpus):
+    for variant, _, puzzle, solution in corpus:
+        assert dlx.count_solutions(puzzle, variant) == 1
+        assert is_solution(solution, puzzle, variant)
+
+
+def test_corpus_solution_grids_are_distinct(corpus):
+    # No two puzzles of a variant share a solution grid, up to the symmetries and the relabeling of the digits
+    grids = Counter((variant, canonical_form(solution, variant)[0]) for variant, _, _, solution in corpus)
+    assert max(grids.values()) == 1
+    assert set(Counter((variant, level) for variant, level, _, _ in corpus).values()) == {4}
+    assert {level for _, level, _, _ in corpus} == set(LEVELS)
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from clue_propagation import propagate_clues
+from milp_matrix import MilpSudokuSolver
+from normal_sudoku import SudokuSolver
+from puzzle_io import parse_puzzle
+from results import INFEASIBLE
+
+PUZZLE = parse_puzzle("800000000003600000070090200050007000000045700000100030001000068008500010090000400")
+
+
+@pytest.mark.parametrize("clue", [10, -1])
+def test_clues_out_of_range_are_infeasible(clue):
+    # The clue presolve of the propagation=False engines reports the clue instead of indexing with it
+    puzzle = PUZZLE.astype(np.int64)
+    puzzle[0, 1] = clue
+    assert not propagate_clues(puzzle)[2]
+    for solver in (SudokuSolver(msg=False, propagation=False), MilpSudokuSolver(propagation=False)):
+        assert solver.solve(puzzle).status == INFEASIBLE
+        assert solver.count_solutions(puzzle) == 0
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+import dlx
+from puzzle_io import parse_puzzle
+from results import INFEASIBLE
+
+PUZZLE = parse_puzzle("800000000003600000070090200050007000000045700000100030001000068008500010090000400")
+
+
+@pytest.mark.parametrize("clue", [10, -1])
+def test_clues_out_of_range_are_infeasible(clue):
+    puzzle = PUZZLE.astype(np.int64)
+    puzzle[0, 1] = clue
+    assert dlx.solve(puzzle).status == INFEASIBLE
+    assert dlx.count_solutions(puzzle) == 0
@@ -0,0 +1,18 @@
+import numpy as np
+
+import dlx
+from generator import difficulty_score, generate
+from puzzle_io import parse_puzzle
+
+
+def test_generate_unique_solution():
+    puzzle, solution, score = generate("x", max_score=200, rng=np.random.default_rng(0))
+    assert score <= 200 and difficulty_score(puzzle, "x") == score
+    assert dlx.count_solutions(puzzle, "x") == 1
+    assert (dlx.solve(puzzle, "x").grid.reshape(-1) == solution).all()
+
+
+def test_difficulty_score_of_conflicting_clues():
+    # Two 8s in the first row: no search node at all
+    puzzle = parse_puzzle("880000000003600000070090200050007000000045700000100030001000068008500010090000400")
+    assert difficulty_score(puzzle) == 0
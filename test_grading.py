@@ -0,0 +1,32 @@
+import numpy as np
+
+from grading import INVALID, METHODS, grade
+from propagation import TECHNIQUES, CandidateGrid
+from puzzle_io import parse_puzzle
+
+
+def test_ladder_keeps_the_solution(corpus):
+    # Every step of the grading ladder keeps the digit of the solution among the candidates of every cell
+    applied = set()
+    for variant, level, puzzle, solution in corpus:
+        candidate_grid = CandidateGrid(puzzle, variant)
+        methods = [(technique, getattr(candidate_grid, METHODS[technique])) for technique in TECHNIQUES]
+        bits = 1 << (solution.astype(np.int64) - 1)
+        while not candidate_grid.solved:
+            technique = next((technique for technique, method in methods if method()), None)
+            if technique is None:
+                break
+            applied.add(technique)
+            kept = np.array(candidate_grid.candidates, dtype=np.int64) & bits
+            assert kept.all(), f"{technique} removed the solution of {variant} {level} puzzle {puzzle.tobytes().hex()}"
+    assert {"naked_triple", "hidden_triple", "chain"} <= applied
+
+
+def test_grades(corpus):
+    for variant, level, puzzle, _ in corpus:
+        puzzle_grade = grade(puzzle, variant)
+        if level == "easy":
+            assert puzzle_grade.level == "easy"
+        assert puzzle_grade.level != INVALID
+    conflicting = parse_puzzle("880000000003600000070090200050007000000045700000100030001000068008500010090000400")
+    assert grade(conflicting).level == INVALID
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from benchmark import is_solution
+from normal_sudoku import SudokuSolver
+from puzzle_io import parse_puzzle
+from results import INFEASIBLE, SOLVED
+
+PUZZLE = parse_puzzle("800000000003600000070090200050007000000045700000100030001000068008500010090000400")
+
+
+@pytest.mark.parametrize("clue", [10, -1])
+def test_clues_out_of_range_are_infeasible(clue):
+    # The warm model rejects the clue before fixing any bound and stays usable for the next puzzle
+    solver = SudokuSolver(msg=False)
+    puzzle = PUZZLE.astype(np.int64)
+    puzzle[0, 1] = clue
+    assert solver.solve(puzzle, presolve=False).status == INFEASIBLE
+    assert solver.count_solutions(puzzle, presolve=False) == 0
+    assert not solver.fixed_vars
+    result = solver.solve(PUZZLE, presolve=False)
+    assert result.status == SOLVED and is_solution(result.grid, PUZZLE, "normal")
@@ -0,0 +1,33 @@
+import numpy as np
+
+from propagation import CandidateGrid
+
+# CandidateGrid methods of propagate(), from the easiest
+TECHNIQUES = ("naked_singles", "hidden_singles", "locked_candidates", "naked_pairs", "hidden_pairs", "x_wing")
+
+
+def test_techniques_keep_the_solution(corpus):
+    # Every technique keeps the digit of the solution among the candidates of every cell
+    applied = set()
+    for variant, level, puzzle, solution in corpus:
+        candidate_grid = CandidateGrid(puzzle, variant)
+        methods = [(technique, getattr(candidate_grid, technique)) for technique in TECHNIQUES]
+        bits = 1 << (solution.astype(np.int64) - 1)
+        while not candidate_grid.solved:
+            technique = next((technique for technique, method in methods if method()), None)
+            if technique is None:
+                break
+            applied.add(technique)
+            kept = np.array(candidate_grid.candidates, dtype=np.int64) & bits
+            assert kept.all(), f"{technique} removed the solution of {variant} {level} puzzle {puzzle.tobytes().hex()}"
+    # The corpus exercises the harder techniques too
+    assert set(TECHNIQUES) <= applied
+
+
+def test_propagate_keeps_the_solution(corpus):
+    # propagate() keeps the solution among the candidates and solves the easy and medium puzzles without search
+    for variant, level, puzzle, solution in corpus:
+        candidate_grid = CandidateGrid(puzzle, variant)
+        solved = candidate_grid.propagate()
+        assert candidate_grid.candidate_array()[np.arange(len(solution)), solution - 1].all()
+        assert solved or level not in ("easy", "medium")
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import dlx
+from benchmark import is_solution, load_corpus
+from results import INFEASIBLE, SOLVED
+from solution_cache import CachedSolver, canonical_form, get_symmetries
+from variants import VARIANTS
+
+
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+def test_cached_solver_maps_hits_back(variant):
+    # A relabeled, rotated or reflected repeat is a cache hit mapped back to a solution of the repeat
+    rng = np.random.default_rng(0)
+    solver = CachedSolver(lambda puzzle: dlx.solve(puzzle, variant), variant)
+    symmetries = get_symmetries(variant)[1:]
+    puzzles = [puzzle for name, _, puzzle in load_corpus()[1] if name == variant]
+    for puzzle in puzzles:
+        assert solver.solve(puzzle).stats["cache"] == "miss"
+        for transform in symmetries[rng.permutation(len(symmetries))[:3]]:
+            labels = np.concatenate(([0], rng.permutation(9) + 1)).astype(np.uint8)
+            repeat = labels[puzzle.reshape(-1)[transform]].reshape(9, 9)
+            result = solver.solve(repeat)
+            assert result.stats["cache"] == "hit"
+            assert result.status == SOLVED and is_solution(result.grid, repeat, variant)
+
+
+@pytest.mark.parametrize("clue", [10, -1])
+def test_clues_out_of_range_bypass_the_cache(clue):
+    solver = CachedSolver(lambda puzzle: dlx.solve(puzzle, "normal"))
+    puzzle = np.zeros((9, 9), dtype=np.int64)
+    puzzle[8, 8] = clue
+    for _ in range(2):
+        result = solver.solve(puzzle)
+        assert result.status == INFEASIBLE and result.stats["cache"] == "bypass"
+    assert len(solver.cache) == 0
+    with pytest.raises(ValueError):
+        canonical_form(puzzle)
@@ -0,0 +1,35 @@
+from benchmark import is_solution
+from budget import Budget
+from profiling import SolveProfile
+from puzzle_io import parse_puzzle
+from results import INFEASIBLE, SOLVED, TIMEOUT
+from x_wing_method import solve_sudoku
+
+PUZZLE = parse_puzzle("006700081040000900080003000050070000003506700000030050000800060002000090560009300")
+
+
+def test_solve_result_and_profile():
+    board = PUZZLE.tolist()
+    profile = SolveProfile()
+    result = solve_sudoku(board, profile=profile)
+    assert result.status == SOLVED and is_solution(result.grid, PUZZLE, "normal")
+    assert (result.grid == board).all()
+    assert result.stats["nodes"] == profile.counters["nodes"] > 0
+    assert "search" in result.timings
+
+
+def test_unsolvable_board_is_infeasible():
+    # The last cell of the first row can only hold a 9, already in its column
+    board = [[1, 2, 3, 4, 5, 6, 7, 8, 0], [0] * 8 + [9]] + [[0] * 9 for _ in range(7)]
+    assert solve_sudoku(board).status == INFEASIBLE
+    assert board[0][8] == 0
+
+
+def test_budget_stops_the_search():
+    # 17 clues: minutes of plain backtracking without a budget
+    puzzle = parse_puzzle("000000010400000000020000000000050407008000300001090000300400200050100000000806000")
+    board = puzzle.tolist()
+    result = solve_sudoku(board, budget=Budget(node_limit=10_000))
+    assert result.status == TIMEOUT and result.stats["nodes"] <= 10_000
+    assert (puzzle == board).all()
+    assert solve_sudoku(puzzle.tolist(), budget=Budget(time_limit=0.2)).status == TIMEOUT
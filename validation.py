@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import sys
+
+import numpy as np
+
+from puzzle_io import read_puzzles
+from variants import VARIANTS, get_variant
+
+# Grids checked at a time, bounds the temporary arrays of validate_batch
+CHUNK_SIZE = 1 << 12
+
+
+def region_name(variant, region):
+    # "row 0".."row 8", "column 0".., "box 0".. then "extra 0".. for the regions of the variant
+    variant = get_variant(variant)
+    kind, index = divmod(region, variant.size)
+    if kind < 3:
+        return f"{('row', 'column', 'box')[kind]} {index}"
+    return f"extra {region - 3 * variant.size}"
+
+
+_incidence = {}
+
+def _get_incidence(variant):
+    # (cells, regions) 0/1 matrix of the cells of every region, built once per variant
+    if variant.name not in _incidence:
+        dtype = np.float32 if variant.size <= 16 else np.float64
+        incidence = np.zeros((variant.cells, len(variant.regions)), dtype=dtype)
+        incidence[variant.region_cells, np.arange(len(variant.regions))[:, None]] = 1
+        _incidence[variant.name] = incidence
+    return _incidence[variant.name]
+
+
+class ValidationReport:
+    """
+    Result of validate_batch.
+    :param variant: Variant of the grids
+    :param valid: (n,) bool array, True for the valid grids
+    :param region_errors: (n, regions) bool array, True for the regions of a grid that do not hold
+                          every value once (regions in variant.regions order, see region_name)
+    :param clue_errors: (n, cells) bool array, True for the given cells changed by a grid (None without puzzles)
+    """
+    __slots__ = ("variant", "valid", "region_errors", "clue_errors")
+
+    def __init__(self, variant, valid, region_errors, clue_errors=None):
+        self.variant = variant
+        self.valid = valid
+        self.region_errors = region_errors
+        self.clue_errors = clue_errors
+
+    @property
+    def all_valid(self):
+        return bool(self.valid.all())
+
+    def invalid(self):
+        # Indices of the invalid grids
+        return np.flatnonzero(~self.valid)
+
+    def failures(self):
+        """
+        :return: generator of (grid index, names of the failing regions, changed given cells) for every invalid grid
+        """
+        for index in self.invalid().tolist():
+            regions = [region_name(self.variant, region) for region in np.flatnonzero(self.region_errors[index]).tolist()]
+            cells = [] if self.clue_errors is None else np.flatnonzero(self.clue_errors[index]).tolist()
+            yield index, regions, cells
+
+    def __repr__(self):
+        return f"ValidationReport({self.variant.name!r}, {len(self.valid)} grids, {len(self.invalid())} invalid)"
+
+
+def validate_batch(grids, variant="normal", puzzles=None):
+    """
+    Checks many solved grids at once. Every value v of a grid becomes the bit 1 << (v-1) (0 for the
+    values out of 1..size), and one product with the cell/region incidence matrix sums the bits of
+    every region of every grid: a sum of size powers of two is 2^size - 1 only without a repeated
+    (carried) bit, so a region is valid exactly when its sum is 2^size - 1.
+    :param grids: (n, size, size) or (n, cells) array of solved grids
+    :param variant: name of a registered variant or a Variant, its extra regions are checked too
+    :param puzzles: (n, size, size) array of the puzzles, the given cells must be kept (None to skip the check)
+    :return: ValidationReport
+    """
+    variant = get_variant(variant)
+    grids = np.asarray(grids).reshape(-1, variant.cells)
+    incidence = _get_incidence(variant)
+    # Value -> bit, every value outside 1..size (0, above size or below 0) has no bit
+    bits = np.zeros(256, dtype=incidence.dtype)
+    bits[1:variant.size + 1] = 2.0 ** np.arange(variant.size)
+    full = 2.0 ** variant.size - 1
+
+    region_errors = np.empty((len(grids), len(variant.regions)), dtype=bool)
+    for start in range(0, len(grids), CHUNK_SIZE):
+        chunk = grids[start:start + CHUNK_SIZE]
+        if chunk.dtype != np.uint8:
+            # Values outside 0..255 would wrap around in uint8
+            chunk = np.where((chunk >= 0) & (chunk <= variant.size), chunk, 0).astype(np.uint8)
+        np.not_equal(bits[chunk] @ incidence, full, out=region_errors[start:start + CHUNK_SIZE])
+    valid = ~region_errors.any(axis=1)
+
+    clue_errors = None
+    if puzzles is not None:
+        puzzles = np.asarray(puzzles).reshape(-1, variant.cells)
+        clue_errors = (puzzles != 0) & (puzzles != grids)
+        valid &= ~clue_errors.any(axis=1)
+    return ValidationReport(variant, valid, region_errors, clue_errors)
+
+
+def _read_chunk(grids, out):
+    # Reads the next len(out) grids of an iterator into out, returns the number read
+    count = 0
+    for count, grid in enumerate(itertools.islice(grids, len(out)), 1):
+        out[count - 1] = grid.reshape(-1)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a file of solved grids (81 character lines, optionally .gz/.bz2)")
+    parser.add_argument("solutions", help="solution file, '-' for stdin")
+    parser.add_argument("--puzzles", default=None, help="puzzle file in the same order, the given cells must be kept")
+    parser.add_argument("--variant", default="normal", choices=sorted(VARIANTS))
+    args = parser.parse_args(argv)
+
+    solutions = read_puzzles(args.solutions)
+    puzzles = None if args.puzzles is None else read_puzzles(args.puzzles)
+    # One chunk of the files at a time, the files can be larger than the memory
+    grids = np.empty((CHUNK_SIZE, 81), dtype=np.uint8)
+    given = None if puzzles is None else np.empty((CHUNK_SIZE, 81), dtype=np.uint8)
+    total = invalid = 0
+    while True:
+        count = _read_chunk(solutions, grids)
+        if given is not None:
+            given_count = _read_chunk(puzzles, given)
+            if given_count != count:
+                parser.error(f"the solution and puzzle files differ in length (after {total + min(count, given_count)} grids)")
+        if not count:
+            break
+        report = validate_batch(grids[:count], args.variant, None if given is None else given[:count])
+        for index, regions, cells in report.failures():
+            details = regions + [f"given cell {cell}" for cell in cells]
+            print(f"{total + index}: {', '.join(details)}")
+        total += count
+        invalid += len(report.invalid())
+        if count < CHUNK_SIZE:
+            break
+    print(f"{total - invalid}/{total} valid", file=sys.stderr)
+    return 0 if not invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import math
+import re
+
+import numpy as np
+
+
+class Variant:
+    """
+    A sudoku variant described as data: the board size and the regions (cell lists)
+    in which every value must appear exactly once.
+    Rows, columns and boxes are always regions; extra_regions adds the regions of the variant.
+    Region and peer lookups are computed once when the variant is created.
+    :param name: name of the variant in the registry
+    :param extra_regions: list of cell lists [(row, col), ...] in which every value must appear only once
+    :param box_size: size of a box (3 for the usual 9x9 board)
+    """
+    def __init__(self, name, extra_regions=(), box_size=3):
+        self.name = name
+        self.box_size = box_size
+        self.size = box_size * box_size
+        self.cells = self.size * self.size
+        size = self.size
+
+        self.extra_regions = [list(region) for region in extra_regions]
+        self.regions = ([[(row, col) for col in range(size)] for row in range(size)] +
+                        [[(row, col) for row in range(size)] for col in range(size)] +
+                        [[(box // box_size * box_size + row, box % box_size * box_size + col)
+                          for row in range(box_size) for col in range(box_size)] for box in range(size)] +
+                        self.extra_regions)
+        for region in self.extra_regions:
+            if len(set(region)) != size or not all(0 <= row < size and 0 <= col < size for (row, col) in region):
+                raise ValueError(f"Every region of variant {name!r} must have {size} distinct cells of the board")
+
+        # region_cells[region] = flat cell indices (row*size + col) of the region
+        self.region_cells = np.array([[row*size + col for (row, col) in region] for region in self.regions], dtype=np.intp)
+        # cell_regions[cell] = indices of the regions containing the cell (in increasing order)
+        cell_regions = [[] for _ in range(self.cells)]
+        for region, cells in enumerate(self.region_cells.tolist()):
+            for cell in cells:
+                cell_regions[cell].append(region)
+        self.cell_regions = tuple(tuple(regions) for regions in cell_regions)
+        # peers[cell] = sorted flat indices of the other cells sharing a region with the cell
+        self.peers = tuple(np.setdiff1d(self.region_cells[list(self.cell_regions[cell])], [cell])
+                           for cell in range(self.cells))
+
+    def __repr__(self):
+        return f"Variant({self.name!r}, {len(self.extra_regions)} extra regions, size={self.size})"
+
+
+# The main and the secondary diagonal must contain values 1 to 9 once each
+DIAGONAL_REGIONS = [[(i, i) for i in range(9)],
+                    [(i, 8-i) for i in range(9)]]
+
+# The four 3x3 grids inside the sudoku must contain values 1 to 9 once each
+INSIDE_SQUARE_REGIONS = [[(grid_row+row, grid_col+col) for row in range(0,3) for col in range(0,3)]
+                         for grid_row, grid_col in [(1, 1), (1, 5), (5, 1), (5, 5)]]
+
+# The four pyramids must contain values 1 to 9 once each
+PYRAMID_REGIONS = [[(1,0),(2,0),(3,0),(4,0),(5,0),(2,1),(3,1),(4,1),(3,2)],
+                   [(0,3),(0,4),(0,5),(0,6),(0,7),(1,4),(1,5),(1,6),(2,5)],
+                   [(3,8),(4,8),(5,8),(6,8),(7,8),(4,7),(5,7),(6,7),(5,6)],
+                   [(8,1),(8,2),(8,3),(8,4),(8,5),(7,2),(7,3),(7,4),(6,3)]]
+
+# Cells at the same position inside every 3x3 grid (same colour) must contain values 1 to 9 once each
+# red, purple, olive, yellow, black, cyan, blue, lightgray, pink
+POSITION_REGIONS = [[(0,0),(0,3),(0,6),(3,0),(3,3),(3,6),(6,0),(6,3),(6,6)],
+                    [(0,1),(0,4),(0,7),(3,1),(3,4),(3,7),(6,1),(6,4),(6,7)],
+                    [(0,2),(0,5),(0,8),(3,2),(3,5),(3,8),(6,2),(6,5),(6,8)],
+                    [(1,0),(1,3),(1,6),(4,0),(4,3),(4,6),(7,0),(7,3),(7,6)],
+                    [(1,1),(1,4),(1,7),(4,1),(4,4),(4,7),(7,1),(7,4),(7,7)],
+                    [(1,2),(1,5),(1,8),(4,2),(4,5),(4,8),(7,2),(7,5),(7,8)],
+                    [(2,0),(2,3),(2,6),(5,0),(5,3),(5,6),(8,0),(8,3),(8,6)],
+                    [(2,1),(2,4),(2,7),(5,1),(5,4),(5,7),(8,1),(8,4),(8,7)],
+                    [(2,2),(2,5),(2,8),(5,2),(5,5),(5,8),(8,2),(8,5),(8,8)]]
+
+
+VARIANTS = {}
+
+def register_variant(name, extra_regions=(), box_size=3):
+    VARIANTS[name] = Variant(name, extra_regions, box_size)
+    return VARIANTS[name]
+
+
+register_variant("normal")
+register_variant("x", DIAGONAL_REGIONS)
+register_variant("four_square", INSIDE_SQUARE_REGIONS)
+register_variant("four_pyramids", PYRAMID_REGIONS)
+register_variant("position", POSITION_REGIONS)
+
+
+def sized_variant(box_size):
+    """
+    Plain variant (rows, columns and boxes only) of a box_size^2 x box_size^2 board,
+    registered on first use as "normal_16x16", "normal_25x25", ... ("normal" for box size 3).
+    """
+    if box_size == 3:
+        return VARIANTS["normal"]
+    size = box_size * box_size
+    name = f"normal_{size}x{size}"
+    if name not in VARIANTS:
+        register_variant(name, box_size=box_size)
+    return VARIANTS[name]
+
+
+def get_variant(variant, box_size=None):
+    """
+    Accepts a registered variant name (or "normal_NxN" for a plain board of any size) or a Variant instance.
+    :param box_size: box size of the board, selects the plain variant of that size for "normal"
+    """
+    if not isinstance(variant, Variant):
+        match = re.fullmatch(r"normal_(\d+)x\1", str(variant))
+        if variant in VARIANTS:
+            variant = VARIANTS[variant]
+        elif match and math.isqrt(int(match[1])) ** 2 == int(match[1]):
+            variant = sized_variant(math.isqrt(int(match[1])))
+        else:
+            raise ValueError(f"Unknown variant {variant!r}, expected one of {', '.join(VARIANTS)}")
+    if box_size is None or box_size == variant.box_size:
+        return variant
+    if variant.box_size == 3 and variant.name == "normal":
+        return sized_variant(box_size)
+    raise ValueError(f"Variant {variant.name!r} only exists with box size {variant.box_size}")
@@ -1,130 +1,151 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import time
-
-
-def apply_x_wing(board):
-   
-      for num in range(1, 10):
-          # Check X-Wing pattern in rows
-          for row in range(9):
-              candidate_cols = []
-              for col in range(9):
-                  if board[row][col] == num:
-                      candidate_cols.append(col)
-              if len(candidate_cols) == 2:
-                  col1, col2 = candidate_cols
-                  # Check if the same two columns appear in another row
-                  for other_row in range(row + 1, 9):
-                      if board[other_row][col1] == num and board[other_row][col2] == num:
-                          # Eliminate num from other cells in the same columns
-                          for eliminate_row in range(9):
-                              if eliminate_row != row and eliminate_row != other_row:
-                                  if board[eliminate_row][col1] == num:
-                                      board[eliminate_row][col1] = 0
-                                  if board[eliminate_row][col2] == num:
-                                      board[eliminate_row][col2] = 0
-
-          # Check X-Wing pattern in columns
-          for col in range(9):
-              candidate_rows = []
-              for row in range(9):
-                  if board[row][col] == num:
-                      candidate_rows.append(row)
-              if len(candidate_rows) == 2:
-                  row1, row2 = candidate_rows
-                  # Check if the same two rows appear in another column
-                  for other_col in range(col + 1, 9):
-                      if board[row1][other_col] == num and board[row2][other_col] == num:
-                          # Eliminate num from other cells in the same rows
-                          for eliminate_col in range(9):
-                              if eliminate_col != col and eliminate_col != other_col:
-                                  if board[row1][eliminate_col] == num:
-                                      board[row1][eliminate_col] = 0
-                                  if board[row2][eliminate_col] == num:
-                                      board[row2][eliminate_col] = 0
-
-def is_valid(board, row, col, num):
-    # Check if the current number placement is valid in the given row
-    for c in range(9):
-        if board[row][c] == num:
-            return False
-
-    # Check if the current number placement is valid in the given column
-    for r in range(9):
-        if board[r][col] == num:
-            return False
-
-    # Check if the current number placement is valid in the corresponding 3x3 grid
-    start_row = (row // 3) * 3
-    start_col = (col // 3) * 3
-    for r in range(start_row, start_row + 3):
-        for c in range(start_col, start_col + 3):
-            if board[r][c] == num:
-                return False
-
-    return True
-
-def solve_sudoku(board):
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == 0:
-                for num in range(1, 10):
-                    if is_valid(board, row, col, num):
-                        board[row][col] = num
-                        if solve_sudoku(board):
-                            return True
-                        board[row][col] = 0  # Undo the current placement if it leads to an invalid solution
-                return False
-    return True
-
-
-def plot_sudoku(grid):
-    fig, ax = plt.subplots(figsize=(6,6))
-    ax.imshow(grid, cmap='binary', vmin=0, vmax=9)
-    ax.set_xticks(np.arange(-.5, 9, 1))
-    ax.set_yticks(np.arange(-.5, 9, 1))
-    ax.grid(color='black', linestyle='-', linewidth=2)
-    ax.tick_params(axis='both', length=0)
-
-    for i in range(0, 10, 3):
-        ax.axhline(i-0.5, color='purple', linewidth=3)
-        ax.axvline(i-0.5, color='purple', linewidth=3)
-
-    for i in range(9):
-        for j in range(9):
-            if grid[i][j] != 0:
-                ax.text(j, i, grid[i][j], color='blue', fontsize=16, ha='center', va='center')
-            else:
-              ax.add_patch(plt.Rectangle((j-0.5, i-0.5), 1, 1, fill=False, edgecolor='black', linewidth=2))
-    plt.axis('off')
-    plt.show()
-
-
-normal_sudoku = [
-                    [0,0,6, 7,0,0, 0,8,1],
-                    [0,4,0, 0,0,0, 9,0,0],
-                    [0,8,0, 0,0,3, 0,0,0],
-                # ------------------
-                    [0,5,0, 0,7,0, 0,0,0],
-                    [0,0,3, 5,0,6, 7,0,0],
-                    [0,0,0, 0,3,0, 0,5,0],
-                # ------------------
-                    [0,0,0, 8,0,0, 0,6,0],
-                    [0,0,2, 0,0,0, 0,9,0],
-                    [5,6,0, 0,0,9, 3,0,0]
-                ]
-
-# Start measuring time
-start_time = time.time()
-
-apply_x_wing(normal_sudoku)
-solve_sudoku(normal_sudoku)
-
-# Stop measuring time
-end_time = time.time()
-solving_time = end_time - start_time
-print("Sudoku solved succesfully!")
-print(f"Solving time: {solving_time} seconds")
-
-plot_sudoku(normal_sudoku)
\ No newline at end of file
+import logging
+import sys
+import time
+from time import perf_counter
+
+import numpy as np
+
+from profiling import finish_profile, start_profile
+from propagation import CandidateGrid, Contradiction
+from results import INFEASIBLE, SOLVED, TIMEOUT, make_result
+from variants import sized_variant
+
+logger = logging.getLogger(__name__)
+
+
+def apply_x_wing(board, box_size=3):
+    """
+    Runs the candidate propagation (singles, locked candidates, pairs and X-Wing over the
+    candidates of every cell, see propagation.py) and fills the board with the placed values.
+    :param board: list of list of integers (or board.Board) representing a Sudoku puzzle (0 represents an empty cell)
+    :param box_size: size of a box (3 for the usual 9x9 board)
+    :return: False if the propagation found a contradiction, True otherwise
+    """
+    size = box_size * box_size
+    try:
+        candidate_grid = CandidateGrid(board, sized_variant(box_size))
+        candidate_grid.propagate()
+    except Contradiction:
+        return False
+    for cell, value in enumerate(candidate_grid.values):
+        if value:
+            board[cell // size][cell % size] = value
+    return True
+
+def is_valid(board, row, col, num, box_size=3):
+    size = box_size * box_size
+    # Check if the current number placement is valid in the given row
+    for c in range(size):
+        if board[row][c] == num:
+            return False
+
+    # Check if the current number placement is valid in the given column
+    for r in range(size):
+        if board[r][col] == num:
+            return False
+
+    # Check if the current number placement is valid in the corresponding box
+    start_row = (row // box_size) * box_size
+    start_col = (col // box_size) * box_size
+    for r in range(start_row, start_row + box_size):
+        for c in range(start_col, start_col + box_size):
+            if board[r][c] == num:
+                return False
+
+    return True
+
+def solve_sudoku(board, box_size=3, profile=None, budget=None):
+    """
+    Solves a board with plain recursive backtracking: the first empty cell gets the values in order.
+    :param board: list of list of integers (or board.Board) representing a Sudoku puzzle (0 represents an empty cell),
+                  filled in place if it is solvable
+    :param box_size: size of a box (3 for the usual 9x9 board)
+    :param profile: profiling.SolveProfile receiving the "search" phase, the nodes and the backtracks
+    :param budget: budget.Budget of the solve (time, nodes, cancel handle), None for no limit
+    :return: results.SolveResult with the solved grid (INFEASIBLE if the board has no solution, TIMEOUT
+             if the budget ran out first, the board is then left as given), the nodes and backtracks in stats
+    """
+    start = perf_counter()
+    size = box_size * box_size
+    profile = start_profile(profile, "x_wing_backtracking")
+    if budget is not None:
+        budget.start()
+    # Search nodes (calls of search) and values taken back
+    nodes = backtracks = 0
+    # Node count of the next budget check: the first node, then every CHECK_INTERVAL nodes (never without a budget)
+    next_check = sys.maxsize if budget is None else 1
+    stopped = False
+
+    def search():
+        nonlocal nodes, backtracks, next_check, stopped
+        nodes += 1
+        if nodes >= next_check:
+            if budget.exhausted(nodes):
+                stopped = True
+                return False
+            next_check = budget.next_check(nodes)
+        for row in range(size):
+            for col in range(size):
+                if board[row][col] == 0:
+                    for num in range(1, size + 1):
+                        if is_valid(board, row, col, num, box_size):
+                            board[row][col] = num
+                            if search():
+                                return True
+                            board[row][col] = 0  # Undo the current placement if it leads to an invalid solution
+                            if stopped:
+                                return False
+                            backtracks += 1
+                    return False
+        return True
+
+    with profile.phase("search"):
+        solved = search()
+    profile.count("nodes", nodes)
+    profile.count("backtracks", backtracks)
+    finish_profile(profile)
+    status = SOLVED if solved else TIMEOUT if stopped else INFEASIBLE
+    return make_result("x_wing_backtracking", status, np.array(board, dtype=np.uint8),
+                       size, profile, start, nodes=nodes, backtracks=backtracks)
+
+def plot_sudoku(grid):
+    # Plotting lives in the optional rendering module, imported only when a plot is requested
+    from rendering import plot_sudoku
+    plot_sudoku(grid, outline_empty=True)
+
+
+if __name__ == "__main__":
+    from board import Board
+
+    normal_sudoku = Board([
+                        [0,0,6, 7,0,0, 0,8,1],
+                        [0,4,0, 0,0,0, 9,0,0],
+                        [0,8,0, 0,0,3, 0,0,0],
+                    # ------------------
+                        [0,5,0, 0,7,0, 0,0,0],
+                        [0,0,3, 5,0,6, 7,0,0],
+                        [0,0,0, 0,3,0, 0,5,0],
+                    # ------------------
+                        [0,0,0, 8,0,0, 0,6,0],
+                        [0,0,2, 0,0,0, 0,9,0],
+                        [5,6,0, 0,0,9, 3,0,0]
+                    ])
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Start measuring time
+    start_time = time.time()
+
+    apply_x_wing(normal_sudoku)
+    result = solve_sudoku(normal_sudoku)
+
+    # Stop measuring time
+    end_time = time.time()
+    solving_time = end_time - start_time
+    if result.solved:
+        logger.info("Sudoku solved succesfully!")
+    else:
+        logger.info("Sudoku is unsolvable.")
+    logger.info("Solving time: %s seconds", solving_time)
+
+    plot_sudoku(normal_sudoku)